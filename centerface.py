@@ -1,13 +1,42 @@
 import os
+import threading
 
 from functools import lru_cache
 
 import numpy as np
 import cv2
 
+try:
+    from numba import njit
+except ImportError:  # Numba is optional, it is only used to speed up preprocessing
+    njit = None
+
 
 # Find file relative to the location of this code files
 default_onnx_path = f'{os.path.dirname(__file__)}/centerface.onnx'
+# INT8 model written by quantize_centerface.py, used by the onnxrt backend if int8=True
+default_int8_onnx_path = f'{os.path.dirname(__file__)}/centerface_int8.onnx'
+# Serialized TensorRT engines are cached here (one per GPU / input shape)
+trt_cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'privacylens', 'trt')
+
+
+# Local onnxruntime execution providers, fastest first. Other available providers come after these,
+#  except AzureExecutionProvider, which sends requests to a remote endpoint instead of running the model
+preferred_execution_providers = [
+    'TensorrtExecutionProvider', 'CUDAExecutionProvider', 'ROCMExecutionProvider', 'DmlExecutionProvider',
+    'CoreMLExecutionProvider', 'OpenVINOExecutionProvider', 'CPUExecutionProvider',
+]
+
+# Providers that run the Q/DQ nodes of the INT8 model as INT8 kernels. Others (e.g. CUDA) dequantize
+#  them and run FP32 convolutions, which is slower than the FP32 model
+int8_execution_providers = ['TensorrtExecutionProvider', 'CPUExecutionProvider']
+
+
+def order_execution_providers(available_providers):
+    """Sort the available onnxruntime providers so GPU providers are tried first and the CPU provider last"""
+    rank = {p: i for i, p in enumerate(preferred_execution_providers)}
+    local = [p for p in available_providers if p != 'AzureExecutionProvider']
+    return sorted(local, key=lambda p: rank.get(p, rank['CPUExecutionProvider'] - 0.5))
 
 
 def ensure_rgb(img: np.ndarray) -> np.ndarray:
@@ -19,12 +48,50 @@ def ensure_rgb(img: np.ndarray) -> np.ndarray:
     return img
 
 
+if njit is not None:
+    @njit(cache=True)
+    def _hwc_to_chw(img, out):
+        h, w, c = img.shape
+        # Channel-major loop order so the float32 output is written contiguously
+        for ch in range(c):
+            for y in range(h):
+                for x in range(w):
+                    out[ch, y, x] = img[y, x, ch]
+
+
+def preprocess_batch(imgs, size, resized=None, out=None):
+    """Convert a list of RGB uint8 frames into a float32 NCHW network input of size (w, h)
+
+    resized (N, h, w, 3) and out (N, 3, h, w) are optional buffers to resize into and to write the input to.
+    """
+    w, h = size
+    if out is None:
+        out = np.empty((len(imgs), 3, h, w), dtype=np.float32)
+    for i, img in enumerate(imgs):
+        if img.shape[:2] != (h, w):
+            # Bilinear resizing skips pixels (aliasing) from 2x downscaling on; INTER_AREA averages them instead
+            interpolation = cv2.INTER_AREA if img.shape[0] >= 2 * h and img.shape[1] >= 2 * w else cv2.INTER_LINEAR
+            img = cv2.resize(img, (w, h), dst=None if resized is None else resized[i], interpolation=interpolation)
+        if njit is not None and img.dtype == np.uint8:
+            # A single fused uint8 HWC -> float32 CHW pass
+            _hwc_to_chw(img, out[i])
+        else:
+            np.copyto(out[i], img.transpose(2, 0, 1), casting='unsafe')
+    return out
+
+
 class CenterFace:
-    def __init__(self, onnx_path=None, in_shape=None, backend='auto', override_execution_provider=None):
+    def __init__(self, onnx_path=None, in_shape=None, backend='auto', override_execution_provider=None,
+                 max_batch_size=None, int8=False):
         self.in_shape = in_shape
         self.onnx_input_name = 'input.1'
         self.onnx_output_names = ['537', '538', '539', '540']
+        # The network and the reused output buffers can only serve one call at a time
+        self._infer_lock = threading.Lock()
+        # Input buffers are per thread, so preprocessing can still run while another thread infers
+        self._local = threading.local()
 
+        use_default_model = onnx_path is None
         if onnx_path is None:
             onnx_path = default_onnx_path
 
@@ -49,23 +116,62 @@ class CenterFace:
             # Silence warnings about unnecessary bn initializers
             onnxruntime.set_default_logger_severity(3)
 
-            static_model = onnx.load(onnx_path)
-            dyn_model = self.dynamicize_shapes(static_model)
-
-            # onnxruntime.get_available_providers() Returns a list of all
-            #  available providers in a reasonable ordering (GPU providers
-            #  first, then accelerated CPU providers like OpenVINO, then
-            #  CPUExecutionProvider as the last choice).
+            # Use GPU providers first (CUDA for onnxruntime-gpu), then accelerated
+            #  CPU providers like OpenVINO, then CPUExecutionProvider as the last choice.
             #  In normal conditions, overriding this choice won't be necessary.
             available_providers = onnxruntime.get_available_providers()
             if override_execution_provider is None:
-                ort_providers = available_providers
+                ort_providers = order_execution_providers(available_providers)
             else:
                 if override_execution_provider not in available_providers:
                     raise ValueError(f'{override_execution_provider=} not found. Available providers are: {available_providers}')
                 ort_providers = [override_execution_provider]
 
+            if int8 and use_default_model:
+                if ort_providers[0] not in int8_execution_providers:
+                    print(f'The quantized model is slower on {ort_providers[0]}, using the FP32 model.')
+                elif not os.path.isfile(default_int8_onnx_path):
+                    raise FileNotFoundError(
+                        f'Quantized model {default_int8_onnx_path} not found. Create it with quantize_centerface.py.')
+                else:
+                    onnx_path = default_int8_onnx_path
+                    print(f'Using quantized model {onnx_path}.')
+
+            static_model = onnx.load(onnx_path)
+            # A quantized model (the default INT8 one or one passed as onnx_path) has Q/DQ nodes
+            is_int8 = any(node.op_type == 'QuantizeLinear' for node in static_model.graph.node)
+            dyn_model = self.dynamicize_shapes(static_model)
+
+            if 'TensorrtExecutionProvider' in ort_providers:
+                # Build FP16 engines and keep them on disk so only the first run pays the build time
+                os.makedirs(trt_cache_dir, exist_ok=True)
+                trt_options = {
+                    'trt_fp16_enable': True,
+                    'trt_engine_cache_enable': True,
+                    'trt_engine_cache_path': trt_cache_dir,
+                    'trt_timing_cache_enable': True,
+                    'trt_int8_enable': is_int8,  # Use the Q/DQ scales of the quantized model
+                }
+                if in_shape is not None:
+                    # The input size is fixed: build one engine whose profile covers every batch size up to
+                    #  max_batch_size, instead of rebuilding it when a smaller (e.g. the last) batch comes in
+                    w, h, _, _ = self.shape_transform(in_shape, in_shape[::-1])
+                    n = max_batch_size or 1
+                    trt_options.update({
+                        'trt_profile_min_shapes': f'{self.onnx_input_name}:1x3x{h}x{w}',
+                        'trt_profile_opt_shapes': f'{self.onnx_input_name}:{n}x3x{h}x{w}',
+                        'trt_profile_max_shapes': f'{self.onnx_input_name}:{n}x3x{h}x{w}',
+                        'trt_engine_cache_prefix': f'centerface_{w}x{h}_b{n}_{"int8" if is_int8 else "fp16"}',
+                    })
+                ort_providers = [
+                    (p, trt_options) if p == 'TensorrtExecutionProvider' else p
+                    for p in ort_providers
+                ]
+
             self.sess = onnxruntime.InferenceSession(dyn_model.SerializeToString(), providers=ort_providers)
+            # Reuse one IOBinding and per-shape output buffers instead of letting ORT allocate outputs on every call
+            self.io_binding = self.sess.io_binding()
+            self._output_buffers = {}
 
             preferred_provider = self.sess.get_providers()[0]
             print(f'Running on {preferred_provider}.')
@@ -94,32 +200,83 @@ class CenterFace:
         return dyn_model
 
     def __call__(self, img, threshold=0.5):
-        img = ensure_rgb(img)
-        orig_shape = img.shape[:2]
+        dets, lms = self.infer_batch([img], threshold=threshold)
+        return dets[0], lms[0]
+
+    def infer_batch(self, imgs, threshold=0.5):
+        """Run detection on a batch of frames with a single forward pass.
+
+        All frames are resized to the same network input size, so frames of
+        different sizes can only be batched together if in_shape is set.
+        Returns a list of dets and a list of landmarks, one entry per frame.
+        """
+        imgs = [ensure_rgb(img) for img in imgs]
+        orig_shape = imgs[0].shape[:2]
+        if self.in_shape is None and any(img.shape[:2] != orig_shape for img in imgs):
+            raise ValueError('Frames of different sizes can only be batched if in_shape is set')
         in_shape = orig_shape[::-1] if self.in_shape is None else self.in_shape
         # Compute sizes
-        w_new, h_new, scale_w, scale_h = self.shape_transform(in_shape, orig_shape)
+        w_new, h_new, _, _ = self.shape_transform(in_shape, orig_shape)
 
-        blob = cv2.dnn.blobFromImage(
-            img, scalefactor=1.0, size=(w_new, h_new),
-            mean=(0, 0, 0), swapRB=False, crop=False
-        )
-        if self.backend == 'opencv':
-            self.net.setInput(blob)
-            heatmap, scale, offset, lms = self.net.forward(self.onnx_output_names)
-        elif self.backend == 'onnxrt':
-            heatmap, scale, offset, lms = self.sess.run(self.onnx_output_names, {self.onnx_input_name: blob})
-        else:
-            raise RuntimeError(f'Unknown backend {self.backend}')
-        dets, lms = self.decode(heatmap, scale, offset, lms, (h_new, w_new), threshold=threshold)
-        if len(dets) > 0:
-            dets[:, 0:4:2], dets[:, 1:4:2] = dets[:, 0:4:2] / scale_w, dets[:, 1:4:2] / scale_h
-            lms[:, 0:10:2], lms[:, 1:10:2] = lms[:, 0:10:2] / scale_w, lms[:, 1:10:2] / scale_h
-        else:
-            dets = np.empty(shape=[0, 5], dtype=np.float32)
-            lms = np.empty(shape=[0, 10], dtype=np.float32)
+        # One NCHW float32 tensor for the whole batch
+        blob = self.preprocess(imgs, (w_new, h_new))
+        with self._infer_lock:
+            if self.backend == 'opencv':
+                self.net.setInput(blob)
+                heatmap, scale, offset, lms = self.net.forward(self.onnx_output_names)
+            elif self.backend == 'onnxrt':
+                heatmap, scale, offset, lms = self.run_onnxrt(blob)
+            else:
+                raise RuntimeError(f'Unknown backend {self.backend}')
+
+            dets_list, lms_list = [], []
+            for i, img in enumerate(imgs):
+                _, _, scale_w, scale_h = self.shape_transform(in_shape, img.shape[:2])
+                dets, lms_i = self.decode(
+                    heatmap[i:i + 1], scale[i:i + 1], offset[i:i + 1], lms[i:i + 1],
+                    (h_new, w_new), threshold=threshold
+                )
+                if len(dets) > 0:
+                    # Scale back in place, multiplying by float32 reciprocals (no float64 temporaries)
+                    inv_w, inv_h = np.float32(1 / scale_w), np.float32(1 / scale_h)
+                    dets[:, 0:4:2] *= inv_w
+                    dets[:, 1:4:2] *= inv_h
+                    lms_i[:, 0:10:2] *= inv_w
+                    lms_i[:, 1:10:2] *= inv_h
+                else:
+                    dets = np.empty(shape=[0, 5], dtype=np.float32)
+                    lms_i = np.empty(shape=[0, 10], dtype=np.float32)
+                dets_list.append(dets)
+                lms_list.append(lms_i)
+
+        return dets_list, lms_list
+
+    def preprocess(self, imgs, size):
+        """preprocess_batch into buffers of this thread, reused while the input size stays the same"""
+        w, h = size
+        n = len(imgs)
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None or buffers[0].shape[1:3] != (h, w) or len(buffers[0]) < n:
+            buffers = (np.empty((n, h, w, 3), dtype=np.uint8), np.empty((n, 3, h, w), dtype=np.float32))
+            self._local.buffers = buffers
+        resized, blob = buffers
+        return preprocess_batch(imgs, size, resized=resized[:n], out=blob[:n])
 
-        return dets, lms
+    def run_onnxrt(self, blob):
+        """Run the onnxrt session on blob, writing the outputs into preallocated buffers"""
+        outputs = self._output_buffers.get(blob.shape)
+        if outputs is None:
+            if len(self._output_buffers) >= 8:  # Input sizes vary for images, don't keep buffers for all of them
+                self._output_buffers.clear()
+            n, _, h, w = blob.shape
+            # heatmap, scale, offset and landmarks at 1/4 of the input resolution
+            outputs = [np.empty((n, c, h // 4, w // 4), dtype=np.float32) for c in (1, 2, 2, 10)]
+            self._output_buffers[blob.shape] = outputs
+        self.io_binding.bind_cpu_input(self.onnx_input_name, blob)
+        for name, out in zip(self.onnx_output_names, outputs):
+            self.io_binding.bind_output(name, 'cpu', 0, np.float32, out.shape, out.ctypes.data)
+        self.sess.run_with_iobinding(self.io_binding)
+        return outputs
 
     @staticmethod
     @lru_cache(maxsize=128)
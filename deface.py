@@ -4,18 +4,31 @@ import argparse
 import json
 import mimetypes
 import os
+import platform
+import queue
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory, util as mp_util
+from functools import lru_cache, partial
 from typing import Dict, Tuple
 
 import tqdm
-import skimage.draw
 import numpy as np
 import imageio
 import imageio.v2 as iio
 import imageio.plugins.ffmpeg
 import cv2
 
+try:
+    from numba import njit
+except ImportError:  # Numba is optional, it is only used to speed up the elliptical mask blend
+    njit = None
+
 from version import __version__
 from centerface import CenterFace
+from video_capture import open_video_capture
 
 
 def scale_bb(x1, y1, x2, y2, mask_scale=1.0):
@@ -28,6 +41,140 @@ def scale_bb(x1, y1, x2, y2, mask_scale=1.0):
     return np.round([x1, y1, x2, y2]).astype(int)
 
 
+def scale_bb_batch(boxes, mask_scale=1.0):
+    """Vectorized scale_bb() for an (N, 4) array of x1, y1, x2, y2 boxes"""
+    s = mask_scale - 1.0
+    wh = boxes[:, 2:] - boxes[:, :2]
+    out = boxes.copy()
+    out[:, :2] -= wh * s
+    out[:, 2:] += wh * s
+    return np.round(out).astype(np.int32)
+
+
+@lru_cache(maxsize=256)
+def ellipse_mask(h, w):
+    """Boolean (h, w, 1) mask of the ellipse inscribed in a h x w box (cached, read-only)"""
+    mask = np.zeros((h, w), dtype=np.uint8)
+    cv2.ellipse(mask, (w // 2, h // 2), (w // 2, h // 2), 0, 0, 360, 255, -1)
+    mask = mask[:, :, None].astype(bool)
+    mask.flags.writeable = False
+    return mask
+
+
+if njit is not None:
+    # Not parallel=True: Numba's workqueue threading layer hangs the process on exit when it is
+    #  first started from a worker thread (as in the GUI apps). nogil lets decode/encode threads run meanwhile.
+    @njit(cache=True, nogil=True)
+    def _copy_masked(roi, src, mask):
+        """Copy src into roi (in place) wherever mask is set"""
+        h, w, c = roi.shape
+        for y in range(h):
+            for x in range(w):
+                if mask[y, x, 0]:
+                    for ch in range(c):
+                        roi[y, x, ch] = src[y, x, ch]
+else:
+    def _copy_masked(roi, src, mask):
+        """Copy src into roi (in place) wherever mask is set"""
+        np.copyto(roi, src, where=mask)
+
+
+def warmup_kernels():
+    """Compile (or load from the cache) the Numba kernels for the array layouts used on frames.
+
+    Call this before the first frame, so the first faces don't wait for the JIT.
+    """
+    roi = np.zeros((4, 4, 3), dtype=np.uint8)[1:3, 1:3]
+    _copy_masked(roi, np.zeros((2, 2, 3), dtype=np.uint8), ellipse_mask(2, 2))
+
+
+def _mosaic_inplace(roi, mosaicsize):
+    """Pixelate roi in place into tiles of about mosaicsize x mosaicsize pixels.
+
+    Area downscaling averages each tile into one pixel and nearest upscaling repeats it;
+    both are OpenCV SIMD kernels, faster than averaging the tiles ourselves.
+    """
+    h, w = roi.shape[:2]
+    small = cv2.resize(roi, (-(-w // mosaicsize), -(-h // mosaicsize)), interpolation=cv2.INTER_AREA)
+    cv2.resize(small, (w, h), dst=roi, interpolation=cv2.INTER_NEAREST)
+
+
+def box_blur(frame, x1, y1, x2, y2, kernel_w, kernel_h):
+    """Box-filter frame[y1:y2, x1:x2] with windows over the surrounding frame, clipped to the frame borders"""
+    h, w = frame.shape[:2]
+    rx, ry = kernel_w // 2, kernel_h // 2
+    # Window sums from the box plus a margin of the frame around it (cv2.boxFilter uses running sums,
+    #  so the cost doesn't grow with the kernel size); zero padding leaves out pixels beyond the frame
+    px1, py1 = max(0, x1 - rx), max(0, y1 - ry)
+    patch = frame[py1:min(h, y2 + ry), px1:min(w, x2 + rx)]
+    sums = cv2.boxFilter(patch, cv2.CV_64F, (kernel_w, kernel_h), normalize=False, borderType=cv2.BORDER_CONSTANT)
+    sums = sums[y1 - py1:y2 - py1, x1 - px1:x2 - px1]
+    # Divide by the number of window pixels inside the frame
+    ys, xs = np.arange(y1, y2), np.arange(x1, x2)
+    area_h = np.minimum(ys + ry + 1, h) - np.maximum(ys - ry, 0)
+    area_w = np.minimum(xs + rx + 1, w) - np.maximum(xs - rx, 0)
+    area = (area_h[:, None] * area_w[None, :])[:, :, None]
+    return np.floor(sums / area + 0.5).astype(np.uint8)
+
+
+_resized_replaceimg_cache = OrderedDict()
+_resized_replaceimg_lock = threading.Lock()
+
+
+def get_resized_replaceimg(replaceimg, size):
+    """cv2.resize(replaceimg, size), cached per replacement image and target size (read-only result)"""
+    key = (id(replaceimg), size)
+    with _resized_replaceimg_lock:
+        cached = _resized_replaceimg_cache.get(key)
+        # The cache holds a reference to the image, so its id can't be reused while it is cached
+        if cached is not None and cached[0] is replaceimg:
+            _resized_replaceimg_cache.move_to_end(key)
+            return cached[1]
+    resized = cv2.resize(replaceimg, size)
+    resized.flags.writeable = False
+    with _resized_replaceimg_lock:
+        _resized_replaceimg_cache[key] = (replaceimg, resized)
+        if len(_resized_replaceimg_cache) > 64:
+            _resized_replaceimg_cache.popitem(last=False)
+    return resized
+
+
+def blur_passes(blur_intensity):
+    """Number of Gaussian blur passes: multiple passes for extreme levels (1-2)"""
+    return {1: 3, 2: 2}.get(blur_intensity, 1)
+
+
+def blur_factor(blur_intensity):
+    """Convert from 1-10 scale to blur factor (1=strongest, 10=weakest): the box size is divided by it for the kernel"""
+    if blur_intensity <= 5:
+        # Strong blur: map 1-5 to factors 0.5-2.0
+        return 0.5 + (blur_intensity - 1) * 0.375
+    # Weak blur: map 6-10 to factors 2.5-6.0
+    return 2.5 + (blur_intensity - 6) * 0.875
+
+
+def blur_kernel_size(length, bf):
+    """Odd blur kernel size (better for blur algorithms) for a box side of the given length"""
+    # Avoid a zero size kernel for tiny boxes
+    k = max(1, int(abs(length) / bf))
+    return k if k % 2 == 1 else k + 1
+
+
+def blur_region(frame, x1, y1, x2, y2, kernel_w, kernel_h, passes):
+    """Return a blurred copy of frame[y1:y2, x1:x2].
+
+    The region gets passes + 1 box blurs: the first one reads the frame around the region, so no
+    mirrored face pixels come in at its border. A single box filter leaves more facial detail than a
+    Gaussian of the same size (its frequency response has side lobes), hence the extra pass. Every
+    pass costs the same whatever the kernel size, and each face is blurred the same way however
+    many faces the frame has.
+    """
+    region = box_blur(frame, x1, y1, x2, y2, kernel_w, kernel_h)
+    for _ in range(passes):
+        cv2.blur(region, (kernel_w, kernel_h), dst=region)
+    return region
+
+
 def draw_det(
         frame, score, det_idx, x1, y1, x2, y2,
         replacewith: str = 'blur',
@@ -41,59 +188,30 @@ def draw_det(
     if replacewith == 'solid':
         cv2.rectangle(frame, (x1, y1), (x2, y2), ovcolor, -1)
     elif replacewith == 'blur':
-        # Convert from 1-10 scale to blur factor (1=strongest, 10=weakest)
-        if blur_intensity <= 5:
-            # Strong blur: map 1-5 to factors 0.5-2.0
-            bf = 0.5 + (blur_intensity - 1) * 0.375
-        else:
-            # Weak blur: map 6-10 to factors 2.5-6.0
-            bf = 2.5 + (blur_intensity - 6) * 0.875
-        
-        # Get the region to blur
-        region = frame[y1:y2, x1:x2].copy()
-        
-        # Apply multiple blur passes for extreme levels (1-2)
-        blur_passes = 1
-        if blur_intensity == 1:
-            blur_passes = 3
-        elif blur_intensity == 2:
-            blur_passes = 2
-            
-        for _ in range(blur_passes):
-            # Fix: Calculate kernel size properly avoiding division by zero
-            kernel_w = max(1, int(abs(x2 - x1) / bf))
-            kernel_h = max(1, int(abs(y2 - y1) / bf))
-            
-            # Ensure kernel dimensions are odd (better for blur algorithms)
-            kernel_w = kernel_w if kernel_w % 2 == 1 else kernel_w + 1
-            kernel_h = kernel_h if kernel_h % 2 == 1 else kernel_h + 1
-            
-            # Use Gaussian blur for smoother results
-            region = cv2.GaussianBlur(region, (kernel_w, kernel_h), 0)
-        
-        blurred_box = region
+        bf = blur_factor(blur_intensity)
+        kernel_w, kernel_h = blur_kernel_size(x2 - x1, bf), blur_kernel_size(y2 - y1, bf)
+
+        blurred_box = blur_region(frame, x1, y1, x2, y2, kernel_w, kernel_h, blur_passes(blur_intensity))
         if ellipse:
-            roibox = frame[y1:y2, x1:x2]
-            # Get y and x coordinate lists of the "bounding ellipse"
-            ey, ex = skimage.draw.ellipse((y2 - y1) // 2, (x2 - x1) // 2, (y2 - y1) // 2, (x2 - x1) // 2)
-            roibox[ey, ex] = blurred_box[ey, ex]
-            frame[y1:y2, x1:x2] = roibox
+            # Only copy the pixels inside the "bounding ellipse"
+            _copy_masked(frame[y1:y2, x1:x2], blurred_box, ellipse_mask(y2 - y1, x2 - x1))
         else:
             frame[y1:y2, x1:x2] = blurred_box
     elif replacewith == 'img':
         target_size = (x2 - x1, y2 - y1)
-        resized_replaceimg = cv2.resize(replaceimg, target_size)
+        resized_replaceimg = get_resized_replaceimg(replaceimg, target_size)
         if replaceimg.shape[2] == 3:  # RGB
             frame[y1:y2, x1:x2] = resized_replaceimg
         elif replaceimg.shape[2] == 4:  # RGBA
-            frame[y1:y2, x1:x2] = frame[y1:y2, x1:x2] * (1 - resized_replaceimg[:, :, 3:] / 255) + resized_replaceimg[:, :, :3] * (resized_replaceimg[:, :, 3:] / 255)
+            # Integer alpha blend (roi * (255 - a) + img * a) / 255, fits in uint16 without float temporaries
+            roi = frame[y1:y2, x1:x2]
+            alpha = resized_replaceimg[:, :, 3:].astype(np.uint16)
+            blended = roi * (255 - alpha) + resized_replaceimg[:, :, :3] * alpha
+            roi[:] = (blended + 127) // 255
     elif replacewith == 'mosaic':
-        for y in range(y1, y2, mosaicsize):
-            for x in range(x1, x2, mosaicsize):
-                pt1 = (x, y)
-                pt2 = (min(x2, x + mosaicsize - 1), min(y2, y + mosaicsize - 1))
-                color = (int(frame[y, x][0]), int(frame[y, x][1]), int(frame[y, x][2]))
-                cv2.rectangle(frame, pt1, pt2, color, -1)
+        roi = frame[y1:y2, x1:x2]
+        if roi.size > 0:
+            _mosaic_inplace(roi, mosaicsize)
     elif replacewith == 'none':
         pass
     if draw_scores:
@@ -103,18 +221,29 @@ def draw_det(
         )
 
 
+def prepare_boxes(dets, mask_scale, frame_shape):
+    """Scale detection boxes by mask_scale and clip them to the frame.
+
+    Returns the indices of the dets that still have an area and their (N, 4) int32 boxes.
+    """
+    h, w = frame_shape[:2]
+    # Scale all boxes at once, then clip bb coordinates to valid frame region
+    boxes = scale_bb_batch(dets[:, :4], mask_scale)
+    boxes[:, 0::2] = np.clip(boxes[:, 0::2], 0, w - 1)
+    boxes[:, 1::2] = np.clip(boxes[:, 1::2], 0, h - 1)
+    # Drop boxes that have no area left after clipping (e.g. faces at the frame border)
+    keep = np.flatnonzero((boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1]))
+    return keep, boxes[keep]
+
+
 def anonymize_frame(
         dets, frame, mask_scale,
         replacewith, ellipse, draw_scores, replaceimg, mosaicsize,
         blur_intensity=2  # Add this parameter
 ):
-    for i, det in enumerate(dets):
-        boxes, score = det[:4], det[4]
-        x1, y1, x2, y2 = boxes.astype(int)
-        x1, y1, x2, y2 = scale_bb(x1, y1, x2, y2, mask_scale)
-        # Clip bb coordinates to valid frame region
-        y1, y2 = max(0, y1), min(frame.shape[0] - 1, y2)
-        x1, x2 = max(0, x1), min(frame.shape[1] - 1, x2)
+    keep, boxes = prepare_boxes(dets, mask_scale, frame.shape)
+    scores = dets[keep, 4]
+    for i, (x1, y1, x2, y2), score in zip(keep.tolist(), boxes.tolist(), scores):
         draw_det(
             frame, score, i, x1, y1, x2, y2,
             replacewith=replacewith,
@@ -126,11 +255,351 @@ def anonymize_frame(
         )
 
 
+def make_anonymizer(
+        mask_scale, replacewith, ellipse, draw_scores, replaceimg, mosaicsize,
+        blur_intensity=2
+):
+    """Return anonymize(dets, frame) with the options bound, choosing the code path once per video.
+
+    Elliptical blur without scores (the GUI default) gets a specialized path that skips the
+    per-face dispatch in draw_det; all other combinations call anonymize_frame.
+    """
+    if replacewith != 'blur' or not ellipse or draw_scores:
+        return partial(
+            anonymize_frame, mask_scale=mask_scale,
+            replacewith=replacewith, ellipse=ellipse, draw_scores=draw_scores,
+            replaceimg=replaceimg, mosaicsize=mosaicsize, blur_intensity=blur_intensity
+        )
+
+    bf = blur_factor(blur_intensity)
+    passes = blur_passes(blur_intensity)
+
+    def anonymize(dets, frame):
+        _, boxes = prepare_boxes(dets, mask_scale, frame.shape)
+        for x1, y1, x2, y2 in boxes.tolist():
+            kernel_w, kernel_h = blur_kernel_size(x2 - x1, bf), blur_kernel_size(y2 - y1, bf)
+            region = blur_region(frame, x1, y1, x2, y2, kernel_w, kernel_h, passes)
+            _copy_masked(frame[y1:y2, x1:x2], region, ellipse_mask(y2 - y1, x2 - x1))
+
+    return anonymize
+
+
+class SharedFrameBatch:
+    """Batch of uint8 frames backed by shared memory, so worker processes can modify them in place"""
+    def __init__(self, batch_size, frame_shape):
+        shape = (batch_size, *frame_shape)
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+        self.frames = np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    def close(self):
+        del self.frames  # Release the buffer export before closing
+        self.shm.close()
+        self.shm.unlink()
+
+
+_anonymize_pool = None
+_anonymize_pool_replaceimg = None  # Replacement image the workers of _anonymize_pool were started with
+_worker_replaceimg = None  # In a worker process: the replacement image it got from the pool initializer
+
+
+def _init_anonymize_worker(replaceimg):
+    global _worker_replaceimg
+    # Each worker already runs on its own core, don't let OpenCV spawn more threads
+    cv2.setNumThreads(1)
+    # Sent once per worker instead of pickled into every frame task, so it stays the same object
+    #  and get_resized_replaceimg() can serve it from the cache
+    _worker_replaceimg = replaceimg
+
+
+def get_anonymize_pool(workers, replaceimg=None):
+    """Return the module-level worker pool, creating it on first use or for another replacement image"""
+    global _anonymize_pool, _anonymize_pool_replaceimg
+    if _anonymize_pool is not None and _anonymize_pool_replaceimg is not replaceimg:
+        _anonymize_pool.shutdown()
+        _anonymize_pool = None
+    if _anonymize_pool is None:
+        _anonymize_pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_anonymize_worker, initargs=(replaceimg,)
+        )
+        _anonymize_pool_replaceimg = replaceimg
+    return _anonymize_pool
+
+
+def _anonymize_shared(shm_name, shape, index, dets, kwargs):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        frames = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        anonymize_frame(dets, frames[index], replaceimg=_worker_replaceimg, **kwargs)
+        del frames
+    finally:
+        shm.close()
+
+
+def anonymize_frames_parallel(pool, shared_batch, dets_list, **kwargs):
+    """Anonymize the frames of a SharedFrameBatch in place, one worker task per frame.
+
+    kwargs are the anonymize_frame options except replaceimg, which the workers got from get_anonymize_pool().
+    """
+    shm_name, shape = shared_batch.shm.name, shared_batch.frames.shape
+    futures = [
+        pool.submit(_anonymize_shared, shm_name, shape, i, dets, kwargs)
+        for i, dets in enumerate(dets_list)
+        if len(dets) > 0  # Nothing to do for frames without detections
+    ]
+    for future in futures:
+        future.result()
+
+
+def ffmpeg_decode_params(hwaccel=None):
+    """FFmpeg input params for multithreaded decoding (pass as imageio input_params)
+
+    hwaccel selects an FFmpeg hardware decoder (e.g. 'auto' or 'cuda'). Decoded frames
+    are still downloaded to system memory because imageio reads raw RGB from a pipe.
+    """
+    params = ['-threads', str(os.cpu_count() or 1), '-thread_type', 'frame']
+    if hwaccel:
+        params = ['-hwaccel', hwaccel] + params
+    return params
+
+
+def ffmpeg_scale_params(size, hwaccel=None):
+    """imageio reader kwargs that make FFmpeg decode and downscale frames to size (w, h)
+
+    With hwaccel='cuda' the frames are scaled on the GPU by scale_cuda and only the
+    small detection frames are copied back to system memory.
+    """
+    if hwaccel != 'cuda':
+        return {'size': tuple(size), 'input_params': ffmpeg_decode_params(hwaccel)}
+    w, h = size
+    return {
+        'input_params': ['-hwaccel', 'cuda', '-hwaccel_output_format', 'cuda'] + ffmpeg_decode_params(),
+        'output_params': ['-vf', f'scale_cuda={w}:{h},hwdownload,format=nv12'],
+    }
+
+
+def ffmpeg_encode_params():
+    """FFmpeg output params for multithreaded encoding (pass as imageio output_params)"""
+    return ['-threads', str(os.cpu_count() or 1)]
+
+
+# Hardware H.264 encoders in order of preference, as imageio FFmpeg writer configs.
+#  They get an explicit bitrate (-b:v): their own defaults are much lower than what libx264 reaches at its default quality
+_hw_encoder_bitrate = '8M'
+_nvenc_config = {'codec': 'h264_nvenc', 'bitrate': _hw_encoder_bitrate, 'output_params': ['-gpu', '0', '-rc', 'vbr']}
+_hw_encoder_configs = {
+    'Darwin': [
+        {'codec': 'h264_videotoolbox', 'bitrate': _hw_encoder_bitrate},
+    ],
+    'Linux': [
+        _nvenc_config,
+        {
+            'codec': 'h264_vaapi', 'pixelformat': 'vaapi', 'bitrate': _hw_encoder_bitrate,
+            'input_params': ['-vaapi_device', '/dev/dri/renderD128'],
+            'output_params': ['-vf', 'format=nv12,hwupload'],
+        },
+    ],
+    'Windows': [
+        _nvenc_config,
+    ],
+}
+
+
+def _ffmpeg_can_encode(config):
+    """Encode a few blank frames with an imageio writer config to check that the encoder and its device work"""
+    cmd = [
+        imageio.plugins.ffmpeg.get_exe(), '-hide_banner', '-loglevel', 'error',
+        *config.get('input_params', []),
+        '-f', 'lavfi', '-i', 'color=black:size=256x256:rate=25', '-frames:v', '5',
+        *config.get('output_params', []),
+        *(['-b:v', config['bitrate']] if 'bitrate' in config else []),
+        '-c:v', config['codec'], '-pix_fmt', config.get('pixelformat', 'yuv420p'), '-f', 'null', '-'
+    ]
+    try:
+        return subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=20).returncode == 0
+    except (OSError, subprocess.SubprocessError):
+        return False
+
+
+@lru_cache(maxsize=None)
+def _optimized_ffmpeg_config():
+    for config in _hw_encoder_configs.get(platform.system(), []):
+        if _ffmpeg_can_encode(config):
+            return config
+    return {'codec': 'libx264'}
+
+
+def get_optimized_ffmpeg_config():
+    """Return an imageio FFmpeg writer config for the fastest working H.264 encoder.
+
+    Hardware encoders (NVENC, VAAPI, VideoToolbox) are tried with a short trial encode
+    and libx264 is used if none of them works. The probe runs once per process.
+    """
+    return {k: list(v) if isinstance(v, list) else v for k, v in _optimized_ffmpeg_config().items()}
+
+
+_END = object()  # Marks the end of a pipeline queue
+
+
+class _PipelineError:
+    def __init__(self, error):
+        self.error = error
+
+
+def prefetch_iter(iterable, maxsize=8):
+    """Consume iterable on a background thread, keeping up to maxsize items queued ahead.
+
+    Exceptions raised by the iterable are re-raised in the consuming thread.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(_PipelineError(e))
+            return
+        put(_END)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _END:
+                return
+            if isinstance(item, _PipelineError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+class ThreadedWriter:
+    """Wraps an imageio writer so that encoding runs on a background thread.
+
+    Frames passed to append_data() must not be modified afterwards. barrier()
+    returns an event that is set once all frames queued before it are written.
+    """
+    def __init__(self, writer, maxsize=8):
+        self.writer = writer
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        append_data = self.writer.append_data
+        while True:
+            # Wait for one item, then take what else is queued already (up to 16 in all) in one go
+            items = [self.queue.get()]
+            while len(items) < 16:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            for item in items:
+                if item is _END:
+                    return
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif self.error is None:
+                    try:
+                        append_data(item)
+                    except Exception as e:
+                        self.error = e
+
+    def append_data(self, frame):
+        if self.error is not None:
+            raise self.error
+        self.queue.put(frame)
+
+    def barrier(self):
+        event = threading.Event()
+        self.queue.put(event)
+        return event
+
+    def close(self):
+        self.queue.put(_END)
+        self.thread.join()
+        self.writer.close()
+        if self.error is not None:
+            raise self.error
+
+
+def estimate_nframes(meta):
+    """Estimate the frame count of a video from imageio metadata (None if unknown)"""
+    nframes = meta.get('nframes', float('inf'))
+    if nframes != float('inf'):
+        return int(nframes)
+    duration, fps = meta.get('duration'), meta.get('fps')
+    if duration and fps:
+        return int(round(duration * fps))
+    return None
+
+
+def should_process_frame(thumb, prev_thumb, motion_thresh):
+    """Return True if a frame changed enough since the last detection to run the detector again.
+
+    thumb and prev_thumb are small versions of the frames (see MotionGate),
+    motion_thresh is the root mean square pixel difference (0-255) that counts as motion.
+    """
+    if prev_thumb is None:
+        return True
+    # Sum of squared differences without materializing a diff image
+    ssd = cv2.norm(thumb, prev_thumb, cv2.NORM_L2SQR)
+    return ssd > motion_thresh ** 2 * thumb.size
+
+
+class MotionGate:
+    """Skips detection on static frames, forcing a new detection at least every detect_interval frames"""
+    def __init__(self, detect_interval, motion_thresh):
+        self.detect_interval = detect_interval
+        self.motion_thresh = motion_thresh
+        self.prev_thumb = None
+        self.since_detect = 0
+
+    def __call__(self, frame):
+        # Compare against the last detected frame (before anonymization, so masks don't count as motion)
+        # INTER_AREA averages whole pixel blocks, so sensor noise doesn't trigger detections
+        thumb = cv2.resize(frame, (64, 64), interpolation=cv2.INTER_AREA)
+        if self.since_detect + 1 >= self.detect_interval or should_process_frame(thumb, self.prev_thumb, self.motion_thresh):
+            self.prev_thumb = thumb
+            self.since_detect = 0
+            return True
+        self.since_detect += 1
+        return False
+
+
 def cam_read_iter(reader):
     while True:
         yield reader.get_next_data()
 
 
+def batch_iter(frames, batch_size):
+    """Group frames from an iterator into lists of up to batch_size frames"""
+    batch = []
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 def video_detect(
         ipath: str,
         opath: str,
@@ -148,13 +617,24 @@ def video_detect(
         keep_audio: bool = False,
         mosaicsize: int = 20,
         disable_progress_output = False,
-        blur_intensity: int = 2  # Add this parameter
+        blur_intensity: int = 2,  # Add this parameter
+        batch_size: int = 1,
+        workers: int = 1,
+        decoder_scale: bool = False,
+        detect_interval: int = 1,
+        motion_thresh: float = 2.0,
+        hwaccel: str = None,
+        frame_callback = None
 ):
+    # frame_callback(frame_idx, frame, nframes) is called with every anonymized RGB frame (nframes may be None).
+    #  The frame buffer is reused afterwards, so callbacks must copy what they keep. Returning False stops processing.
+    reader_kwargs = {}
+    if 'fps' in ffmpeg_config:
+        reader_kwargs['fps'] = ffmpeg_config['fps']
+    if not cam:
+        reader_kwargs['input_params'] = ffmpeg_decode_params(hwaccel)
     try:
-        if 'fps' in ffmpeg_config:
-            reader: imageio.plugins.ffmpeg.FfmpegFormat.Reader = imageio.get_reader(ipath, fps=ffmpeg_config['fps'])
-        else:
-            reader: imageio.plugins.ffmpeg.FfmpegFormat.Reader = imageio.get_reader(ipath)
+        reader: imageio.plugins.ffmpeg.FfmpegFormat.Reader = imageio.get_reader(ipath, **reader_kwargs)
 
         meta = reader.get_meta_data()
         _ = meta['size']
@@ -168,9 +648,22 @@ def video_detect(
     if cam:
         nframes = None
         read_iter = cam_read_iter(reader)
+        batch_size = 1  # Don't add latency to live camera input
     else:
-        read_iter = reader.iter_data()
-        nframes = reader.count_frames()
+        # Decode on a background thread while the current batch is processed
+        read_iter = prefetch_iter(reader.iter_data(), maxsize=2 * batch_size)
+        # reader.count_frames() would decode the whole file once more just for the progress bar
+        nframes = estimate_nframes(meta)
+
+    det_iter = None
+    if decoder_scale and centerface.in_shape is not None and not cam:
+        # A second decoder delivers frames already downscaled to the detection size,
+        # so the full-res frames are only used for drawing
+        det_reader_kwargs = dict(reader_kwargs, **ffmpeg_scale_params(centerface.in_shape, hwaccel))
+        det_reader = imageio.get_reader(ipath, **det_reader_kwargs)
+        det_iter = prefetch_iter(det_reader.iter_data(), maxsize=2 * batch_size)
+        (w, h), (det_w, det_h) = meta['size'], centerface.in_shape
+        det_scale = np.array([w / det_w, h / det_h, w / det_w, h / det_h], dtype=np.float32)
     if nested:
         bar = tqdm.tqdm(dynamic_ncols=True, total=nframes, position=1, leave=True, disable=disable_progress_output)
     else:
@@ -184,33 +677,117 @@ def video_detect(
         if keep_audio and meta.get('audio_codec'):
             _ffmpeg_config.setdefault('audio_path', ipath)
             _ffmpeg_config.setdefault('audio_codec', 'copy')
-        writer: imageio.plugins.ffmpeg.FfmpegFormat.Writer = imageio.get_writer(
-            opath, format='FFMPEG', mode='I', **_ffmpeg_config
+        output_params = list(_ffmpeg_config.get('output_params', []))
+        if '-threads' not in output_params:
+            _ffmpeg_config['output_params'] = output_params + ffmpeg_encode_params()
+        # Encode on a background thread so the detector doesn't wait for FFmpeg
+        writer = ThreadedWriter(
+            imageio.get_writer(opath, format='FFMPEG', mode='I', **_ffmpeg_config),
+            maxsize=2 * batch_size
         )
 
-    for frame in read_iter:
-        # Perform network inference, get bb dets but discard landmark predictions
-        dets, _ = centerface(frame, threshold=threshold)
+    anonymize_kwargs = dict(
+        mask_scale=mask_scale,
+        replacewith=replacewith, ellipse=ellipse, draw_scores=draw_scores,
+        replaceimg=replaceimg, mosaicsize=mosaicsize,
+        blur_intensity=blur_intensity  # Pass the parameter
+    )
+    shared_batches = []
+    if workers > 1:
+        # Frames live in shared memory so worker processes can anonymize them in place.
+        # Two buffers are used alternately, so one can be refilled while the writer
+        # thread is still encoding the other.
+        w, h = meta['size']
+        shared_batches = [SharedFrameBatch(batch_size, (h, w, 3)) for _ in range(2)]
+        written = [None, None]
+        pool = get_anonymize_pool(workers, replaceimg)
+        parallel_kwargs = {k: v for k, v in anonymize_kwargs.items() if k != 'replaceimg'}
 
-        anonymize_frame(
-            dets, frame, mask_scale=mask_scale,
-            replacewith=replacewith, ellipse=ellipse, draw_scores=draw_scores,
-            replaceimg=replaceimg, mosaicsize=mosaicsize,
-            blur_intensity=blur_intensity  # Pass the parameter
-        )
+    motion_gate = MotionGate(detect_interval, motion_thresh) if detect_interval > 1 else None
 
-        if opath is not None:
-            writer.append_data(frame)
+    # imageio hands out a fresh writable array per frame, so frames are batched and
+    # anonymized in place without staging copies; only preview and shared memory need buffers
+    preview_buf = None
+    frame_idx = 0
+    stop = False
+    try:
+        for batch_idx, frames in enumerate(batch_iter(read_iter, batch_size)):
+            shared_batch = None
+            if shared_batches:
+                slot = batch_idx % 2
+                shared_batch = shared_batches[slot]
+                if written[slot] is not None:
+                    written[slot].wait()  # Don't overwrite frames that are still queued for encoding
+                for i, frame in enumerate(frames):
+                    shared_batch.frames[i] = frame
+                frames = shared_batch.frames[:len(frames)]
 
-        if enable_preview:
-            cv2.imshow('Preview of anonymization results (quit by pressing Q or Escape)', frame[:, :, ::-1])  # RGB -> RGB
-            if cv2.waitKey(1) & 0xFF in [ord('q'), 27]:  # 27 is the escape key code
-                cv2.destroyAllWindows()
+            if det_iter is not None:
+                det_frames = [next(det_iter) for _ in range(len(frames))]
+            else:
+                det_frames = frames
+
+            # Decide which frames need a new detection, the others reuse the previous dets
+            if motion_gate is not None:
+                detect = [motion_gate(frame) for frame in det_frames]
+            else:
+                detect = [True] * len(det_frames)
+
+            # Perform network inference on the whole batch at once, get bb dets but discard landmark predictions
+            new_dets = []
+            if any(detect):
+                new_dets, _ = centerface.infer_batch(
+                    [frame for frame, d in zip(det_frames, detect) if d], threshold=threshold
+                )
+                if det_iter is not None:
+                    for dets in new_dets:
+                        dets[:, :4] *= det_scale  # Map boxes back to full resolution
+            new_dets = iter(new_dets)
+            dets_list = []
+            for d in detect:
+                if d:
+                    last_dets = next(new_dets)
+                dets_list.append(last_dets)
+
+            if shared_batch is not None:
+                anonymize_frames_parallel(pool, shared_batch, dets_list, **parallel_kwargs)
+            else:
+                for frame, dets in zip(frames, dets_list):
+                    anonymize_frame(dets, frame, **anonymize_kwargs)
+
+            for frame in frames:
+                if opath is not None:
+                    writer.append_data(frame)
+
+                if enable_preview:
+                    # RGB -> BGR into a reused buffer (imshow would otherwise copy the reversed view every frame)
+                    preview_buf = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR, dst=preview_buf)
+                    cv2.imshow('Preview of anonymization results (quit by pressing Q or Escape)', preview_buf)
+                    if cv2.waitKey(1) & 0xFF in [ord('q'), 27]:  # 27 is the escape key code
+                        cv2.destroyAllWindows()
+                        stop = True
+                        break
+                if frame_callback is not None and frame_callback(frame_idx, frame, nframes) is False:
+                    stop = True
+                    break
+                frame_idx += 1
+                bar.update()
+            if shared_batch is not None and opath is not None:
+                written[slot] = writer.barrier()
+            if stop:
                 break
-        bar.update()
+    finally:
+        # Stop the decoding threads and let the writer thread finish before releasing buffers
+        read_iter.close()
+        if det_iter is not None:
+            det_iter.close()
+        if opath is not None:
+            writer.close()
+        for shared_batch in shared_batches:
+            shared_batch.close()
     reader.close()
-    if opath is not None:
-        writer.close()
+    if det_iter is not None:
+        det_reader.close()
     bar.close()
 
 
@@ -275,6 +852,16 @@ def get_file_type(path):
     return mime
 
 
+@lru_cache(maxsize=4)
+def get_centerface(in_shape=None, backend='auto', override_execution_provider=None, max_batch_size=None,
+                   int8=False):
+    """Return a shared CenterFace instance, so the model and its session are only loaded once per config"""
+    return CenterFace(
+        in_shape=in_shape, backend=backend, override_execution_provider=override_execution_provider,
+        max_batch_size=max_batch_size, int8=int8
+    )
+
+
 def get_anonymized_image(frame,
                          threshold: float,
                          replacewith: str,
@@ -289,7 +876,7 @@ def get_anonymized_image(frame,
     returns frame
     """
 
-    centerface = CenterFace(in_shape=None, backend='auto')
+    centerface = get_centerface()
     dets, _ = centerface(frame, threshold=threshold)
 
     anonymize_frame(
@@ -301,6 +888,74 @@ def get_anonymized_image(frame,
     return frame
 
 
+def process_file(ipath, opath, centerface, enable_preview=False, nested=False,
+                 common_kwargs=None, video_kwargs=None, image_kwargs=None):
+    """Anonymize one input path (video, camera or image) with the given options"""
+    common_kwargs = common_kwargs or {}
+    if ipath == 'cam':
+        ipath = '<video0>'
+        enable_preview = True
+    filetype = get_file_type(ipath)
+    is_cam = filetype == 'cam'
+    if opath is None and not is_cam:
+        root, ext = os.path.splitext(ipath)
+        opath = f'{root}_anonymized{ext}'
+    print(f'Input:  {ipath}\nOutput: {opath}')
+    if opath is None and not enable_preview:
+        print('No output file is specified and the preview GUI is disabled. No output will be produced.')
+    if filetype == 'video' or is_cam:
+        video_detect(
+            ipath=ipath,
+            opath=opath,
+            centerface=centerface,
+            cam=is_cam,
+            enable_preview=enable_preview,
+            nested=nested,
+            **common_kwargs,
+            **(video_kwargs or {})
+        )
+    elif filetype == 'image':
+        image_detect(
+            ipath=ipath,
+            opath=opath,
+            centerface=centerface,
+            enable_preview=enable_preview,
+            **common_kwargs,
+            **(image_kwargs or {})
+        )
+    elif filetype is None:
+        print(f'Can\'t determine file type of file {ipath}. Skipping...')
+    elif filetype == 'notfound':
+        print(f'File {ipath} not found. Skipping...')
+    else:
+        print(f'File {ipath} has an unknown type {filetype}. Skipping...')
+
+
+def _shutdown_anonymize_pool():
+    global _anonymize_pool
+    if _anonymize_pool is not None:
+        _anonymize_pool.shutdown()
+        _anonymize_pool = None
+
+
+def _init_job_process():
+    # Job processes exit without running atexit handlers, but multiprocessing runs its finalizers
+    #  before that: shut the frame pool down there, once per process instead of after every file.
+    #  It has to run before the finalizers of the pool's own queues (exitpriority 10), which stop
+    #  their feeder threads and would keep the shutdown sentinels from reaching the workers.
+    mp_util.Finalize(None, _shutdown_anonymize_pool, exitpriority=100)
+
+
+def _process_file_job(ipath, opath, centerface_kwargs, common_kwargs, video_kwargs, image_kwargs):
+    # Runs in a worker process of main(); the model and the frame pool are created once per process
+    #  and reused for its files
+    centerface = get_centerface(**centerface_kwargs)
+    process_file(
+        ipath, opath, centerface, nested=True,
+        common_kwargs=common_kwargs, video_kwargs=video_kwargs, image_kwargs=image_kwargs
+    )
+
+
 def parse_cli_args():
     parser = argparse.ArgumentParser(description='Video anonymization by face detection', add_help=False)
     parser.add_argument(
@@ -343,8 +998,8 @@ def parse_cli_args():
         '--keep-audio', '-k', default=False, action='store_true',
         help='Keep audio from video source file and copy it over to the output (only applies to videos).')
     parser.add_argument(
-        '--ffmpeg-config', default={"codec": "libx264"}, type=json.loads,
-        help='FFMPEG config arguments for encoding output videos. This argument is expected in JSON notation. For a list of possible options, refer to the ffmpeg-imageio docs. Default: \'{"codec": "libx264"}\'.'
+        '--ffmpeg-config', default=None, type=json.loads,
+        help='FFMPEG config arguments for encoding output videos. This argument is expected in JSON notation. For a list of possible options, refer to the ffmpeg-imageio docs. Default: the first working hardware H.264 encoder (NVENC, VAAPI or VideoToolbox), otherwise \'{"codec": "libx264"}\'.'
     )  # See https://imageio.readthedocs.io/en/stable/format_ffmpeg.html#parameters-for-saving
     parser.add_argument(
         '--backend', default='auto', choices=['auto', 'onnxrt', 'opencv'],
@@ -352,6 +1007,30 @@ def parse_cli_args():
     parser.add_argument(
         '--execution-provider', '--ep', default=None, metavar='EP',
         help='Override onnxrt execution provider (see https://onnxruntime.ai/docs/execution-providers/). If not specified, the presumably fastest available one will be automatically selected. Only used if backend is onnxrt.')
+    parser.add_argument(
+        '--int8', default=False, action='store_true',
+        help='Use the INT8 model created by quantize_centerface.py. Faster on CPUs and with TensorRT, but slightly less accurate. Ignored on other execution providers. Only used if backend is onnxrt.')
+    parser.add_argument(
+        '--batch-size', default=4, type=int, metavar='N',
+        help='Number of video frames that are passed through the detector at once. Larger batches are faster on GPUs but use more memory. Default: 4.')
+    parser.add_argument(
+        '--workers', default=1, type=int, metavar='N',
+        help='Number of worker processes that anonymize the frames of a batch in parallel. Default: 1 (no worker processes).')
+    parser.add_argument(
+        '--jobs', '-j', default=1, type=int, metavar='J',
+        help='Number of input files that are processed at the same time, each in its own process with its own copy of the model. Only used for multiple inputs without preview. Default: 1.')
+    parser.add_argument(
+        '--decoder-scale', default=False, action='store_true',
+        help='Let a second FFmpeg decoder produce the downscaled detection frames for videos instead of resizing every frame in Python. Requires --scale.')
+    parser.add_argument(
+        '--detect-interval', default=1, type=int, metavar='K',
+        help='Run face detection at least every K frames and in between only on frames with noticeable motion, reusing the previous detections otherwise. Faster for static footage, but faces that appear without motion can be missed for up to K-1 frames. Default: 1 (detect on every frame).')
+    parser.add_argument(
+        '--motion-thresh', default=2.0, type=float, metavar='D',
+        help='Root mean square pixel difference (0-255) to the last detected frame above which a frame counts as moving. Requires --detect-interval > 1. Default: 2.0.')
+    parser.add_argument(
+        '--hwaccel', default=None, metavar='API',
+        help='FFmpeg hardware decoder for input videos, e.g. "auto" or "cuda" (see ffmpeg -hwaccels). Default: software decoding.')
     parser.add_argument(
         '--version', action='version', version=__version__,
         help='Print version number and exit.')
@@ -405,12 +1084,22 @@ def main():
     backend = args.backend
     in_shape = args.scale
     execution_provider = args.execution_provider
+    int8 = args.int8
     mosaicsize = args.mosaicsize
     keep_metadata = args.keep_metadata
     replaceimg = None
     disable_progress_output = args.disable_progress_output
     blur_intensity = args.blur_intensity
+    batch_size = args.batch_size
+    workers = args.workers
+    decoder_scale = args.decoder_scale
+    detect_interval = args.detect_interval
+    motion_thresh = args.motion_thresh
+    hwaccel = args.hwaccel
+    jobs = args.jobs
 
+    if ffmpeg_config is None:
+        ffmpeg_config = get_optimized_ffmpeg_config()
     if in_shape is not None:
         w, h = in_shape.split('x')
         in_shape = int(w), int(h)
@@ -419,68 +1108,62 @@ def main():
         print(f'After opening {args.replaceimg} shape: {replaceimg.shape}')
 
 
-    # TODO: scalar downscaling setting (-> in_shape), preserving aspect ratio
-    centerface = CenterFace(in_shape=in_shape, backend=backend, override_execution_provider=execution_provider)
-
     multi_file = len(ipaths) > 1
-    if multi_file:
-        ipaths = tqdm.tqdm(ipaths, position=0, dynamic_ncols=True, desc='Batch progress')
-
-    for ipath in ipaths:
-        opath = base_opath
-        if ipath == 'cam':
-            ipath = '<video0>'
-            enable_preview = True
-        filetype = get_file_type(ipath)
-        is_cam = filetype == 'cam'
-        if opath is None and not is_cam:
-            root, ext = os.path.splitext(ipath)
-            opath = f'{root}_anonymized{ext}'
-        print(f'Input:  {ipath}\nOutput: {opath}')
-        if opath is None and not enable_preview:
-            print('No output file is specified and the preview GUI is disabled. No output will be produced.')
-        if filetype == 'video' or is_cam:
-            video_detect(
-                ipath=ipath,
-                opath=opath,
-                centerface=centerface,
-                threshold=threshold,
-                cam=is_cam,
-                replacewith=replacewith,
-                mask_scale=mask_scale,
-                ellipse=ellipse,
-                draw_scores=draw_scores,
-                enable_preview=enable_preview,
-                nested=multi_file,
-                keep_audio=keep_audio,
-                ffmpeg_config=ffmpeg_config,
-                replaceimg=replaceimg,
-                mosaicsize=mosaicsize,
-                disable_progress_output=disable_progress_output,
-                blur_intensity=blur_intensity  # Pass the parameter
-            )
-        elif filetype == 'image':
-            image_detect(
-                ipath=ipath,
-                opath=opath,
-                centerface=centerface,
-                threshold=threshold,
-                replacewith=replacewith,
-                mask_scale=mask_scale,
-                ellipse=ellipse,
-                draw_scores=draw_scores,
-                enable_preview=enable_preview,
-                keep_metadata=keep_metadata,
-                replaceimg=replaceimg,
-                mosaicsize=mosaicsize,
-                blur_intensity=blur_intensity  # Pass the parameter
+    common_kwargs = dict(
+        threshold=threshold,
+        replacewith=replacewith,
+        mask_scale=mask_scale,
+        ellipse=ellipse,
+        draw_scores=draw_scores,
+        replaceimg=replaceimg,
+        mosaicsize=mosaicsize,
+        blur_intensity=blur_intensity,  # Pass the parameter
+    )
+    video_kwargs = dict(
+        keep_audio=keep_audio,
+        ffmpeg_config=ffmpeg_config,
+        disable_progress_output=disable_progress_output,
+        batch_size=batch_size,
+        workers=workers,
+        decoder_scale=decoder_scale,
+        detect_interval=detect_interval,
+        motion_thresh=motion_thresh,
+        hwaccel=hwaccel,
+    )
+    image_kwargs = dict(keep_metadata=keep_metadata)
+
+    if jobs > 1 and multi_file and not enable_preview and 'cam' not in ipaths:
+        # Per-video progress bars of parallel jobs would overwrite each other, only show the batch progress
+        video_kwargs['disable_progress_output'] = True
+        centerface_kwargs = dict(
+            in_shape=in_shape, backend=backend, override_execution_provider=execution_provider,
+            max_batch_size=batch_size, int8=int8
+        )
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_job_process) as executor:
+            futures = [
+                executor.submit(_process_file_job, ipath, base_opath, centerface_kwargs, common_kwargs, video_kwargs, image_kwargs)
+                for ipath in ipaths
+            ]
+            for future in tqdm.tqdm(as_completed(futures), total=len(futures), dynamic_ncols=True, desc='Batch progress'):
+                future.result()
+    else:
+        # TODO: scalar downscaling setting (-> in_shape), preserving aspect ratio
+        centerface = CenterFace(
+            in_shape=in_shape, backend=backend, override_execution_provider=execution_provider,
+            max_batch_size=batch_size, int8=int8
+        )
+
+        if multi_file:
+            ipaths = tqdm.tqdm(ipaths, position=0, dynamic_ncols=True, desc='Batch progress')
+
+        for ipath in ipaths:
+            process_file(
+                ipath, base_opath, centerface, enable_preview=enable_preview, nested=multi_file,
+                common_kwargs=common_kwargs, video_kwargs=video_kwargs, image_kwargs=image_kwargs
             )
-        elif filetype is None:
-            print(f'Can\'t determine file type of file {ipath}. Skipping...')
-        elif filetype == 'notfound':
-            print(f'File {ipath} not found. Skipping...')
-        else:
-            print(f'File {ipath} has an unknown type {filetype}. Skipping...')
+
+    if _anonymize_pool is not None:
+        _anonymize_pool.shutdown()
 
 
 if __name__ == '__main__':
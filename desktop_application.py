@@ -4,9 +4,9 @@ import subprocess
 from pathlib import Path
 import time
 import datetime
-import cv2
-import numpy as np
 import platform
+from collections import deque
+from contextlib import contextmanager
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QLabel, QPushButton, 
                             QVBoxLayout, QHBoxLayout, QFileDialog, QSlider, QWidget,
                             QProgressBar, QComboBox, QSpinBox, QCheckBox, QGroupBox,
@@ -15,21 +15,29 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QLabel, QPushButton,
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer, QSize
 from PyQt6.QtGui import QImage, QPixmap, QColor, QFont, QIcon
 
-# Import the frame extraction app
-from frame_extraction import FrameExtractionApp
-from face_anonymizer_images import FaceAnonymizationBatchApp
-from face_anonymizer_videos import FaceAnonymizationVideoApp
+# The tool windows and the deface/OpenCV stack are imported when they are first used,
+# so the welcome screen comes up without loading OpenCV, onnxruntime and friends
+
+
+def auto_detection_size(width, height, long_side=640):
+    """Detection size (w, h) with the long side fitted to long_side and the frame's aspect ratio.
+
+    Returns None (detect at full resolution) if the frame is not larger or its size is unknown.
+    """
+    if width <= 0 or height <= 0 or max(width, height) <= long_side:
+        return None
+    f = long_side / max(width, height)
+    return max(1, round(width * f)), max(1, round(height * f))
 
-# Import deface module directly
-from centerface import CenterFace
-import deface
 
 class VideoProcessingThread(QThread):
-    """Thread for processing videos with deface without freezing the UI"""
-    progress_updated = pyqtSignal(int)
-    frame_processed = pyqtSignal(QImage, int, int)  # current frame, current frame number, total frames
+    """Thread for processing videos with deface without freezing the UI.
+
+    Progress and log lines are not sent as signals per update; the UI polls
+    progress and log_lines on a timer instead.
+    """
+    frame_processed = pyqtSignal(object, int, int)  # downscaled RGB frame (ndarray), current frame number, total frames
     processing_finished = pyqtSignal(str)
-    log_message = pyqtSignal(str)
     
     def __init__(self, input_file, output_file, options):
         super().__init__()
@@ -37,15 +45,23 @@ class VideoProcessingThread(QThread):
         self.output_file = output_file
         self.options = options
         self.is_running = True
+        self.progress = 0
+        self.log_lines = deque()  # Appended here, popped by the UI thread
+    
+    def log(self, message):
+        self.log_lines.append(message)
     
     def run(self):
+        import cv2
+        # Import deface module directly
+        from centerface import CenterFace
+        import deface
+
         try:
             # Create output folder if it doesn't exist
-            output_dir = os.path.dirname(self.output_file)
-            if output_dir:
-                os.makedirs(output_dir, exist_ok=True)
+            Path(self.output_file).parent.mkdir(parents=True, exist_ok=True)
             
-            self.log_message.emit(f"Processing video: {os.path.basename(self.input_file)}")
+            self.log(f"Processing video: {Path(self.input_file).name}")
             
             # Configure options for deface module
             threshold = self.options["threshold"]
@@ -54,17 +70,49 @@ class VideoProcessingThread(QThread):
             ellipse = not self.options["box_method"]
             draw_scores = self.options["draw_scores"]
             mosaicsize = self.options["mosaic_size"] if "mosaic_size" in self.options else 20
+            skip_static_frames = self.options.get("skip_static_frames", False)
             
             # Prepare scale parameter
+            # CenterFace resizes frames to this size for detection and maps the boxes back to full resolution
             scale = None
-            if self.options["scale"] and self.options["scale"] != "None":
-                scale = self.options["scale"]
+            auto_scale = self.options["scale"] == "Auto"
+            if self.options["scale"] and self.options["scale"] not in ("None", "Auto"):
+                scale_parts = self.options["scale"].split('x')
+                if len(scale_parts) == 2:
+                    try:
+                        scale = (int(scale_parts[0]), int(scale_parts[1]))
+                    except ValueError:
+                        scale = None
             
-            # Configure ffmpeg_config
-            ffmpeg_config = {"codec": "libx264"}
+            # Configure ffmpeg options (hardware encoder such as NVENC if one works, libx264 otherwise)
+            ffmpeg_config = deface.get_optimized_ffmpeg_config()
+            ffmpeg_config["output_params"] = ffmpeg_config.get("output_params", []) + deface.ffmpeg_encode_params()
             
-            # Create CenterFace instance
+            # Compile the anonymization kernels now rather than on the first face
+            deface.warmup_kernels()
+            
+            # Initialize video reader (OpenCV decodes in process, no frames piped from an ffmpeg subprocess).
+            #  It is opened before the detector, so an automatic detection size can follow the video's aspect
+            #  ratio (a fixed 16:9 size squeezes faces in portrait videos, making them harder to detect)
+            reader = deface.open_video_capture(self.input_file)
+            if auto_scale:
+                scale = auto_detection_size(
+                    int(reader.get(cv2.CAP_PROP_FRAME_WIDTH)), int(reader.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                )
+                self.log(f"Detection resolution: {'%dx%d' % scale if scale else 'full'}")
+            
+            # Create CenterFace instance (onnxruntime on the GPU when a GPU provider is available)
             centerface = CenterFace(in_shape=scale)
+            on_gpu = False
+            if centerface.backend == 'onnxrt':
+                provider = centerface.sess.get_providers()[0]
+                on_gpu = provider != 'CPUExecutionProvider'
+                self.log(f"Face detection running on {provider}")
+            
+            # With the detector on the GPU, two OpenCV threads are enough for resizing and blurring
+            #  next to the decode, encode and UI threads; on the CPU the work is CPU bound either way
+            cv2.setNumThreads(2 if on_gpu else os.cpu_count() or 1)
+            cv2.ocl.setUseOpenCL(False)  # Per-face OpenCL kernels cost more in uploads than they save
             
             # Use video_detect from deface module directly
             class CustomVideoProcessingCallback:
@@ -72,108 +120,161 @@ class VideoProcessingThread(QThread):
                     self.thread = thread_instance
                     self.frame_count = 0
                     self.total_frames = 0
+                    self.preview_every = 5  # Send every 5th frame for preview to avoid GUI slowdown
+                    self.last_progress = -1
                     
                 def update_progress(self, progress):
-                    self.thread.progress_updated.emit(progress)
+                    self.thread.progress = progress
                     
                 def process_frame(self, frame):
                     # Increment frame counter
                     self.frame_count += 1
                     
                     # Send frame for preview
-                    if hasattr(frame, 'shape'):
+                    if self.frame_count % self.preview_every == 0 and hasattr(frame, 'shape'):
+                        # Downscale here, so only a small new array crosses to the UI thread (which builds the QImage)
                         h, w = frame.shape[:2]
-                        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        bytes_per_line = 3 * w
-                        qt_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-                        self.thread.frame_processed.emit(qt_image, self.frame_count, self.total_frames)
+                        preview_scale = min(1, 480 / w, 270 / h)
+                        preview_size = (max(1, round(w * preview_scale)), max(1, round(h * preview_scale)))
+                        preview = cv2.resize(frame, preview_size, interpolation=cv2.INTER_AREA)
+                        self.thread.frame_processed.emit(preview, self.frame_count, self.total_frames)
                     
-                    # Update progress
+                    # Update progress (only when the percentage changes)
                     if self.total_frames > 0:
                         progress = min(int((self.frame_count / self.total_frames) * 100), 99)
-                        self.thread.progress_updated.emit(progress)
+                        if progress != self.last_progress:
+                            self.last_progress = progress
+                            self.thread.progress = progress
                     
                     # Log frame info (less frequently to avoid flooding)
                     if self.frame_count % 30 == 0:
                         if self.total_frames > 0:
-                            self.thread.log_message.emit(f"Processing frame: {self.frame_count}/{self.total_frames} " +
+                            self.thread.log(f"Processing frame: {self.frame_count}/{self.total_frames} " +
                                                          f"({(self.frame_count/self.total_frames*100):.1f}%)")
                         else:
-                            self.thread.log_message.emit(f"Processing frame: {self.frame_count}")
+                            self.thread.log(f"Processing frame: {self.frame_count}")
                     
                     return self.thread.is_running  # Return False to stop processing
             
             # Create callback instance
             callback = CustomVideoProcessingCallback(self)
             
-            # Get total frames for progress tracking
-            try:
-                cap = cv2.VideoCapture(self.input_file)
-                if cap.isOpened():
-                    callback.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                    cap.release()
-            except Exception as e:
-                self.log_message.emit(f"Could not determine total frames: {str(e)}")
-            
             # Use our custom function to enable frame-by-frame processing with callbacks
             def custom_video_detect():
-                # Initialize video reader
                 import imageio
-                reader = imageio.get_reader(self.input_file)
-                meta = reader.get_meta_data()
+                writer = None
+                frames = None
+                completed = False
+                try:
+                    if not reader.isOpened():
+                        raise IOError(f"Could not open video: {self.input_file}")
+                    fps = reader.get(cv2.CAP_PROP_FPS) or 30
+                    # Get total frames for progress tracking from the container header the reader already parsed
+                    callback.total_frames = max(0, int(reader.get(cv2.CAP_PROP_FRAME_COUNT)))
                 
-                # Initialize video writer
-                writer = imageio.get_writer(
-                    self.output_file, format='FFMPEG', 
-                    mode='I', fps=meta.get('fps', 30),
-                    codec='libx264'
-                )
+                    def read_frames():
+                        while True:
+                            ret, frame = reader.read()
+                            if not ret:
+                                return
+                            # The detector, the writer and the preview all take RGB; swap in place, no second frame
+                            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame)
+                            yield frame
                 
-                # Process each frame
-                frame_idx = 0
-                for frame in reader:
-                    if not self.is_running:
-                        break
-                    
-                    # Detect faces
-                    dets, _ = centerface(frame, threshold=threshold)
-                    
-                    # Anonymize faces
-                    deface.anonymize_frame(
-                        dets, frame, mask_scale=mask_scale,
+                    # Initialize video writer (encodes on a background thread)
+                    writer = deface.ThreadedWriter(imageio.get_writer(
+                        self.output_file, format='FFMPEG', 
+                        mode='I', fps=fps,
+                        **ffmpeg_config
+                    ))
+                
+                    # Decode on a background thread too, so reading, detection and encoding overlap
+                    batch_size = 4  # Frames per detector forward pass
+                    frames = deface.prefetch_iter(read_frames(), maxsize=2 * batch_size)
+                
+                    # The anonymization options are fixed for the whole video, pick the code path once
+                    anonymize = deface.make_anonymizer(
+                        mask_scale=mask_scale,
                         replacewith=replacewith, ellipse=ellipse, 
                         draw_scores=draw_scores, replaceimg=None,
                         mosaicsize=mosaicsize
                     )
+                
+                    # Reuse the last detections on frames that barely changed (forcing a detection every 10 frames)
+                    motion_gate = deface.MotionGate(detect_interval=10, motion_thresh=2.0) if skip_static_frames else None
+                    last_dets = None
+                
+                    # Process each frame
+                    frame_idx = 0
+                    for batch in deface.batch_iter(frames, batch_size):
+                        if not self.is_running:
+                            break
                     
-                    # Write frame to output
-                    writer.append_data(frame)
+                        # Decide which frames need a new detection, before they are anonymized
+                        if motion_gate is not None:
+                            detect = [motion_gate(frame) for frame in batch]
+                        else:
+                            detect = [True] * len(batch)
                     
-                    # Call callback
-                    frame_idx += 1
-                    callback.process_frame(frame)
-                
-                # Cleanup
-                reader.close()
-                writer.close()
+                        # Detect faces in the whole batch with a single forward pass
+                        new_dets = []
+                        if any(detect):
+                            new_dets, _ = centerface.infer_batch(
+                                [frame for frame, d in zip(batch, detect) if d], threshold=threshold
+                            )
+                        new_dets = iter(new_dets)
+                        dets_list = []
+                        for d in detect:
+                            if d:
+                                last_dets = next(new_dets)
+                            dets_list.append(last_dets)
+                    
+                        for frame, dets in zip(batch, dets_list):
+                            # Anonymize faces
+                            anonymize(dets, frame)
+                        
+                            # Write frame to output
+                            writer.append_data(frame)
+                        
+                            # Call callback
+                            frame_idx += 1
+                            callback.process_frame(frame)
+                    
+                    completed = True
+                finally:
+                    # Stop the decoding thread and let the writer thread finish, also when detection failed
+                    if frames is not None:
+                        frames.close()
+                    reader.release()
+                    if writer is not None:
+                        if completed:
+                            writer.close()
+                        else:
+                            # Don't raise over the original error, and don't leave a half-written video behind
+                            try:
+                                writer.close()
+                            except Exception:
+                                pass
+                            if os.path.exists(self.output_file):
+                                os.remove(self.output_file)
                 
                 return frame_idx
             
             # Run the processing
-            self.log_message.emit(f"Starting video processing with deface module...")
+            self.log(f"Starting video processing with deface module...")
             try:
                 frames_processed = custom_video_detect()
-                self.log_message.emit(f"Video processing completed. Processed {frames_processed} frames.")
-                self.progress_updated.emit(100)  # Ensure 100% at the end
+                self.log(f"Video processing completed. Processed {frames_processed} frames.")
+                self.progress = 100  # Ensure 100% at the end
                 self.processing_finished.emit("Video processing completed")
             except Exception as e:
                 error_msg = f"Error during video processing: {str(e)}"
-                self.log_message.emit(error_msg)
+                self.log(error_msg)
                 self.processing_finished.emit("Processing failed")
         
         except Exception as e:
             error_msg = f"Error during video processing: {str(e)}"
-            self.log_message.emit(error_msg)
+            self.log(error_msg)
             self.processing_finished.emit(error_msg)
     
     def stop(self):
@@ -181,6 +282,16 @@ class VideoProcessingThread(QThread):
         self.is_running = False
 
 
+@contextmanager
+def busy_cursor():
+    """Show a wait cursor while a tool window imports its modules and builds its UI"""
+    QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+    try:
+        yield
+    finally:
+        QApplication.restoreOverrideCursor()
+
+
 class WelcomeWindow(QMainWindow):
     """Welcome screen for the Privacy Lens application"""
     
@@ -211,20 +322,12 @@ class WelcomeWindow(QMainWindow):
             QLabel {
                 color: white;
             }
-        """)
-
-        button_style = """
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
+            QPushButton#menuButton {
                 border-radius: 5px;
                 padding: 10px;
                 font-size: 14pt;
             }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-        """
+        """)
         
         # Create central widget
         central_widget = QWidget()
@@ -273,18 +376,18 @@ class WelcomeWindow(QMainWindow):
         self.video_button = QPushButton("Video Face Anonymization")
         self.video_button.setFixedSize(400, 70)
         self.video_button.clicked.connect(self.open_video_anonymization)
-        self.video_button.setStyleSheet(button_style)
+        self.video_button.setObjectName("menuButton")  # Styled by the window stylesheet, parsed once
 
 
         self.extract_button = QPushButton("Extract Frames from Videos")
         self.extract_button.setFixedSize(400, 70)
         self.extract_button.clicked.connect(self.open_frame_extraction)
-        self.extract_button.setStyleSheet(button_style)
+        self.extract_button.setObjectName("menuButton")  # Styled by the window stylesheet, parsed once
 
         self.image_button = QPushButton("Image Face Anonymization")
         self.image_button.setFixedSize(400, 70)
         self.image_button.clicked.connect(self.open_image_anonymization)
-        self.image_button.setStyleSheet(button_style)
+        self.image_button.setObjectName("menuButton")  # Styled by the window stylesheet, parsed once
 
         buttons_layout.addWidget(self.video_button)
         buttons_layout.addWidget(self.extract_button)
@@ -302,9 +405,24 @@ class WelcomeWindow(QMainWindow):
         # Add equal stretch at bottom to push content to center
         layout.addStretch(1)
     
+    def raise_open_window(self, name):
+        """Bring the tool window stored in attribute name to the front, returns False if it isn't open"""
+        window = getattr(self, name, None)
+        if window is None or not window.isVisible():
+            return False
+        window.raise_()
+        window.activateWindow()
+        return True
+    
     def open_video_anonymization(self):
+        # Reuse an open window: no second import and UI build, and a running job isn't torn down
+        if self.raise_open_window('video_window'):
+            return
         try:
-            self.video_window = FaceAnonymizationVideoApp()
+            # cv2, numpy and the model code are first imported here, which takes a moment
+            with busy_cursor():
+                from face_anonymizer_videos import FaceAnonymizationVideoApp
+                self.video_window = FaceAnonymizationVideoApp()
             # Set the icon
             if hasattr(self, 'windowIcon') and not self.windowIcon().isNull():
                 self.video_window.setWindowIcon(self.windowIcon())
@@ -317,13 +435,17 @@ class WelcomeWindow(QMainWindow):
     
     def open_frame_extraction(self):
         """Open the frame extraction window"""
+        if self.raise_open_window('extract_window'):
+            return
         try:
             self.extract_window = QMainWindow()
             self.extract_window.setWindowTitle("Extract Frames from Videos")
             self.extract_window.setMinimumSize(800, 600)
             
             # Create and set the central widget
-            extract_widget = FrameExtractionApp()
+            with busy_cursor():
+                from frame_extraction import FrameExtractionApp
+                extract_widget = FrameExtractionApp()
             self.extract_window.setCentralWidget(extract_widget)
             
             # Show the window
@@ -333,13 +455,17 @@ class WelcomeWindow(QMainWindow):
     
     def open_image_anonymization(self):
         """Open the image anonymization window"""
+        if self.raise_open_window('image_window'):
+            return
         try:
             self.image_window = QMainWindow()
             self.image_window.setWindowTitle("Image Face Anonymization")
             self.image_window.setMinimumSize(800, 600)
             
             # Create and set the central widget
-            image_widget = FaceAnonymizationBatchApp()
+            with busy_cursor():
+                from face_anonymizer_images import FaceAnonymizationBatchApp
+                image_widget = FaceAnonymizationBatchApp()
             self.image_window.setCentralWidget(image_widget)
             
             # Show the window
@@ -400,6 +526,12 @@ class VideoProcessingApp(QWidget):
         self.progress = QProgressBar()
         layout.addWidget(self.progress)
         
+        # Add preview of the processed frames
+        self.preview_label = QLabel()
+        self.preview_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.preview_label.setMinimumSize(480, 270)
+        layout.addWidget(self.preview_label)
+        
         # Add log
         self.log = QPlainTextEdit()
         self.log.setReadOnly(True)
@@ -409,6 +541,11 @@ class VideoProcessingApp(QWidget):
         self.input_file = ""
         self.output_file = ""
         self.processing_thread = None
+        
+        # Poll the processing thread 10 times per second instead of a signal per progress/log update
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(100)
+        self.poll_timer.timeout.connect(self.poll_processing_thread)
     
     def setup_options(self, layout):
         # Add processing options
@@ -449,6 +586,21 @@ class VideoProcessingApp(QWidget):
         thresh_layout.addWidget(self.thresh_slider)
         options_layout.addLayout(thresh_layout)
         
+        # Detection resolution (detecting on smaller frames is much faster)
+        scale_layout = QHBoxLayout()
+        scale_label = QLabel("Detection Resolution:")
+        self.scale_combo = QComboBox()
+        # "Auto" fits the long side of each video to 640 pixels, keeping its aspect ratio
+        self.scale_combo.addItems(["Auto", "None", "640x360", "1280x720", "1920x1080"])
+        self.scale_combo.setCurrentText("Auto")
+        scale_layout.addWidget(scale_label)
+        scale_layout.addWidget(self.scale_combo)
+        options_layout.addLayout(scale_layout)
+        
+        # Motion skipping
+        self.skip_static_check = QCheckBox("Skip detection on frames without motion (faster for static scenes)")
+        options_layout.addWidget(self.skip_static_check)
+        
         layout.addWidget(options_group)
     
     def select_input_file(self):
@@ -497,19 +649,35 @@ class VideoProcessingApp(QWidget):
             "box_method": False,  # Could add option for this
             "draw_scores": False,  # Could add option for this
             "blur_intensity": self.blur_slider.value(),
-            "scale": None  # Could add option for this
+            "scale": self.scale_combo.currentText(),
+            "skip_static_frames": self.skip_static_check.isChecked()
         }
         
         # Start processing thread
         self.processing_thread = VideoProcessingThread(self.input_file, self.output_file, options)
-        self.processing_thread.progress_updated.connect(self.progress.setValue)
-        self.processing_thread.log_message.connect(self.log_message)
         self.processing_thread.processing_finished.connect(self.processing_finished)
+        self.processing_thread.frame_processed.connect(self.show_preview)
         
         self.log_message("Starting video processing...")
         self.processing_thread.start()
+        self.poll_timer.start()
+    
+    def poll_processing_thread(self):
+        """Show the progress and log lines the processing thread reported since the last poll"""
+        thread = self.processing_thread
+        self.progress.setValue(thread.progress)
+        while thread.log_lines:
+            self.log_message(thread.log_lines.popleft())
+    
+    def show_preview(self, frame, frame_number, total_frames):
+        h, w = frame.shape[:2]
+        image = QImage(frame.data, w, h, frame.strides[0], QImage.Format.Format_RGB888)
+        # fromImage copies the pixels, so the QImage may keep pointing into the array
+        self.preview_label.setPixmap(QPixmap.fromImage(image))
     
     def processing_finished(self, message):
+        self.poll_timer.stop()
+        self.poll_processing_thread()  # Everything the thread reported before it finished
         self.log_message(f"Processing finished: {message}")
         self.process_btn.setEnabled(True)
         self.input_btn.setEnabled(True)
@@ -1,11 +1,12 @@
 import sys
 import os
 from pathlib import Path
-import time
 import datetime
 import cv2
 import numpy as np
 import platform
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QLabel, QPushButton, 
                             QVBoxLayout, QHBoxLayout, QFileDialog, QSlider, QWidget,
@@ -13,13 +14,34 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QLabel, QPushButton,
                             QRadioButton, QButtonGroup, QMessageBox, QPlainTextEdit,
                             QListWidget)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer
-from PyQt6.QtGui import QImage, QPixmap, QColor
+from PyQt6.QtGui import QImage, QImageReader, QPixmap, QColor
 
 # Import deface module directly instead of using subprocess
-from centerface import CenterFace
 import deface
 from version import __version__ as deface_version
 
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def list_image_files(folder):
+    """Return the sorted paths of the image files directly inside folder"""
+    # One scandir pass; the entries carry their file type, so no extra stat per file is needed
+    with os.scandir(folder) as entries:
+        image_files = [Path(entry.path) for entry in entries
+                       if entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file()]
+    image_files.sort()
+    return image_files
+
+
+def read_image(path):
+    """Read an image file into a BGR array (None if it can't be read, like cv2.imread)"""
+    # Reading the bytes with numpy also works for non-ASCII paths on Windows, which cv2.imread doesn't
+    buf = np.fromfile(path, dtype=np.uint8)
+    if not buf.size:
+        return None
+    return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+
 class BatchProcessingThread(QThread):
     """Thread for processing multiple images with deface without freezing the UI"""
     progress_updated = pyqtSignal(int)
@@ -36,7 +58,7 @@ class BatchProcessingThread(QThread):
         self.options = options
         self.is_running = True
         
-        # Create CenterFace detector once for the whole thread
+        # Detection scale for the CenterFace detector
         scale = None
         if self.options["scale"] and self.options["scale"] != "None":
             scale_parts = self.options["scale"].split('x')
@@ -45,11 +67,16 @@ class BatchProcessingThread(QThread):
                     scale = (int(scale_parts[0]), int(scale_parts[1]))
                 except ValueError:
                     scale = None
-        
-        self.centerface = CenterFace(in_shape=scale)
+        self.scale = scale
 
     def run(self):
         try:
+            # Images are all resized to the detection scale if one is set, so they can be detected in batches
+            batch_size = self.options.get("batch_size", 8) if self.scale is not None else 1
+            # The detector is shared between runs with the same settings, so its onnxruntime session
+            # (and IOBinding buffers) is built once per process, and here rather than on the UI thread
+            self.centerface = deface.get_centerface(in_shape=self.scale, max_batch_size=batch_size)
+            
             # Process each image
             all_image_files = []
             input_to_output_folders = {}  # Map input folders to their output folders
@@ -70,22 +97,14 @@ class BatchProcessingThread(QThread):
                         f"{os.path.basename(input_folder)}_anonymized"
                     )
                 
-                input_to_output_folders[input_folder] = output_folder
+                input_to_output_folders[input_folder] = Path(output_folder)
                 os.makedirs(output_folder, exist_ok=True)
                 self.log_message.emit(f"Created output folder: {output_folder}")
 
             # Collect all image files from input folders
             for input_folder in self.input_folders:
-                # Get list of image files
-                image_files = []
-                for ext in ('*.jpg', '*.jpeg', '*.png'):
-                    image_files.extend(Path(input_folder).glob(ext))
-                    
-                # Filter out non-image files and sort them
-                image_files = sorted([f for f in image_files if f.is_file()])
-                
                 # Track which input folder each file belongs to
-                for f in image_files:
+                for f in list_image_files(input_folder):
                     all_image_files.append((f, input_folder))
             
             if not all_image_files:
@@ -96,71 +115,93 @@ class BatchProcessingThread(QThread):
             total_files = len(all_image_files)
             self.log_message.emit(f"Found {total_files} images to process")
             
-            # Process each image using direct deface calls
-            for i, (image_path, input_folder) in enumerate(all_image_files):
-                if not self.is_running:
-                    self.log_message.emit("Processing stopped by user")
-                    self.processing_finished.emit("Processing stopped by user")
-                    return
-                
-                self.current_file_changed.emit(str(image_path.name))
-                self.log_message.emit(f"Processing image {i+1}/{total_files}: {image_path.name}")
-                
-                # Get the output folder for this input folder
-                output_folder = input_to_output_folders[input_folder]
-                output_path = Path(output_folder) / f"{image_path.stem}_anonymized{image_path.suffix}"
-                
+            # Get options (they don't change during the run, so look them up once)
+            threshold = self.options["threshold"]
+            anonymize = deface.make_anonymizer(
+                mask_scale=self.options["mask_scale"],
+                replacewith=self.options["anonymization_method"],
+                ellipse=not self.options["box_method"],
+                draw_scores=self.options["draw_scores"],
+                replaceimg=None,
+                mosaicsize=self.options["mosaic_size"],
+                blur_intensity=self.options["blur_intensity"]
+            )
+            
+            # The images of a batch are decoded in parallel (the decoders release the GIL)
+            decoder = ThreadPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) // 2))
+            
+            def decode(image_path):
                 try:
-                    # Read input image
-                    img = cv2.imread(str(image_path))
-                    
-                    if img is None:
-                        self.log_message.emit(f"Error: Could not read image file: {image_path}")
-                        continue
-                    
-                    # Get options
-                    threshold = self.options["threshold"]
-                    mask_scale = self.options["mask_scale"]
-                    replacewith = self.options["anonymization_method"]
-                    ellipse = not self.options["box_method"]
-                    draw_scores = self.options["draw_scores"]
-                    mosaicsize = self.options["mosaic_size"]
-                    blur_intensity = self.options["blur_intensity"]
-                    
-                    # Detect faces
-                    dets, _ = self.centerface(img, threshold=threshold)
-                    
-                    # Anonymize faces
-                    deface.anonymize_frame(
-                        dets, img, mask_scale=mask_scale,
-                        replacewith=replacewith, ellipse=ellipse, 
-                        draw_scores=draw_scores, replaceimg=None, 
-                        mosaicsize=mosaicsize,
-                        blur_intensity=blur_intensity
-                    )
-                    
-                    # Save the processed image
-                    cv2.imwrite(str(output_path), img)
-                    
-                    self.log_message.emit(f"Successfully processed: {image_path.name}")
-                    
-                    # Load the output image for preview
-                    if os.path.exists(output_path):
-                        try:
-                            # Convert to RGB for Qt
-                            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                            h, w, ch = img_rgb.shape
-                            qt_image = QImage(img_rgb.data, w, h, ch * w, QImage.Format.Format_RGB888)
-                            self.image_processed.emit(str(output_path), qt_image)
-                        except Exception as e:
-                            self.log_message.emit(f"Error preparing preview: {str(e)}")
-                    
-                except Exception as e:
-                    self.log_message.emit(f"Error processing {image_path.name}: {str(e)}")
-                
-                # Update progress
-                progress = int((i + 1) / total_files * 100)
-                self.progress_updated.emit(progress)
+                    return read_image(image_path)
+                except (OSError, cv2.error):
+                    return None
+            
+            def read_batches():
+                for start in range(0, total_files, batch_size):
+                    batch = all_image_files[start:start + batch_size]
+                    yield start, batch, list(decoder.map(decode, [image_path for image_path, _ in batch]))
+            
+            # Images are read on a background thread and written on another one, so decoding and encoding
+            # overlap with detection. The writer has a single thread so results are reported in order.
+            batches = deface.prefetch_iter(read_batches(), maxsize=2)
+            pending = deque()
+            try:
+                with ThreadPoolExecutor(max_workers=1) as writer:
+                    # Process each image using direct deface calls
+                    for start, batch, images in batches:
+                        # Detect faces in all the images of this batch with one forward pass
+                        loaded = [img for img in images if img is not None]
+                        detect_error = None
+                        dets_iter = iter(())
+                        if loaded:
+                            try:
+                                dets_list, _ = self.centerface.infer_batch(loaded, threshold=threshold)
+                                dets_iter = iter(dets_list)
+                            except Exception as e:
+                                detect_error = e
+                        
+                        for i, (image_path, input_folder), img in zip(range(start, total_files), batch, images):
+                            if not self.is_running:
+                                self.log_message.emit("Processing stopped by user")
+                                self.processing_finished.emit("Processing stopped by user")
+                                return
+                            
+                            self.current_file_changed.emit(str(image_path.name))
+                            self.log_message.emit(f"Processing image {i+1}/{total_files}: {image_path.name}")
+                            
+                            # Get the output folder for this input folder
+                            output_path = input_to_output_folders[input_folder] / f"{image_path.stem}_anonymized{image_path.suffix}"
+                            progress = int((i + 1) / total_files * 100)
+                            
+                            try:
+                                if img is None:
+                                    self.log_message.emit(f"Error: Could not read image file: {image_path}")
+                                    pending.append(writer.submit(self.progress_updated.emit, progress))
+                                    continue
+                                
+                                # Faces detected for this image in the batch
+                                if detect_error is not None:
+                                    raise detect_error
+                                dets = next(dets_iter)
+                                
+                                # Anonymize faces
+                                anonymize(dets, img)
+                                
+                                # Save the processed image on the writer thread
+                                pending.append(writer.submit(self.write_image, image_path, output_path, img, progress))
+                                
+                            except Exception as e:
+                                self.log_message.emit(f"Error processing {image_path.name}: {str(e)}")
+                                pending.append(writer.submit(self.progress_updated.emit, progress))
+                            
+                            # Don't let finished images pile up in memory if writing falls behind
+                            while len(pending) > 2 * batch_size:
+                                pending.popleft().result()
+                            while pending and pending[0].done():
+                                pending.popleft()
+            finally:
+                batches.close()
+                decoder.shutdown()
             
             self.log_message.emit(f"Batch processing completed. Processed {total_files} images.")
             self.processing_finished.emit(f"Completed processing {total_files} images")
@@ -170,6 +211,29 @@ class BatchProcessingThread(QThread):
             self.log_message.emit(error_msg)
             self.processing_finished.emit(error_msg)
     
+    def write_image(self, image_path, output_path, img, progress):
+        """Save a processed image and report it (runs on the writer thread)"""
+        try:
+            saved = cv2.imwrite(str(output_path), img)
+            
+            self.log_message.emit(f"Successfully processed: {image_path.name}")
+            
+            # Preview the output image (imwrite reports whether it was written, no need to stat it)
+            if saved:
+                try:
+                    # Qt reads OpenCV's BGR layout directly; copy because the QImage only wraps img's buffer
+                    h, w = img.shape[:2]
+                    qt_image = QImage(img.data, w, h, img.strides[0], QImage.Format.Format_BGR888).copy()
+                    self.image_processed.emit(str(output_path), qt_image)
+                except Exception as e:
+                    self.log_message.emit(f"Error preparing preview: {str(e)}")
+                    
+        except Exception as e:
+            self.log_message.emit(f"Error processing {image_path.name}: {str(e)}")
+        
+        # Update progress
+        self.progress_updated.emit(progress)
+    
     def stop(self):
         """Stop the processing"""
         self.is_running = False
@@ -178,10 +242,8 @@ class BatchProcessingThread(QThread):
         """Safely stop processing and clean up resources"""
         self.is_running = False
         
-        # Give processes time to terminate gracefully
-        start_time = time.time()
-        while self.isRunning() and time.time() - start_time < 2:
-            time.sleep(0.1)
+        # Give processes time to terminate gracefully (blocks on the thread instead of polling it)
+        self.wait(2000)
 
 
 class FaceAnonymizationBatchApp(QMainWindow):
@@ -537,14 +599,7 @@ class FaceAnonymizationBatchApp(QMainWindow):
         all_image_files = []
         
         for folder_path in folder_paths:
-            # Get list of image files
-            image_files = []
-            for ext in ('*.jpg', '*.jpeg', '*.png'):
-                image_files.extend(Path(folder_path).glob(ext))
-            
-            # Sort files
-            image_files = sorted([f for f in image_files if f.is_file()])
-            all_image_files.extend(image_files)
+            all_image_files.extend(list_image_files(folder_path))
         
         if not all_image_files:
             self.append_log("No image files found in the selected folders")
@@ -583,15 +638,27 @@ class FaceAnonymizationBatchApp(QMainWindow):
         self.current_preview_file = file_path
         
         try:
-            # Load image
+            # Let the image decoder scale down to the preview size (JPEG decodes at reduced
+            # resolution), instead of decoding the full image and scaling the pixmap afterwards
+            reader = QImageReader(file_path)
+            reader.setAutoTransform(True)  # Apply EXIF orientation like cv2.imread does
+            size = reader.size()
+            if size.isValid():
+                target = size.scaled(self.preview_label.size(), Qt.AspectRatioMode.KeepAspectRatio)
+                if target.width() < size.width():
+                    reader.setScaledSize(target)
+            qt_image = reader.read()
+            if not qt_image.isNull():
+                self.preview_label.setPixmap(QPixmap.fromImage(qt_image))
+                return
+            
+            # Fall back to OpenCV for formats Qt has no image plugin for
             img = cv2.imread(file_path)
             if img is not None:
-                # Convert to RGB
-                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                h, w, ch = img.shape
+                h, w = img.shape[:2]
                 
-                # Create QImage and QPixmap
-                qt_image = QImage(img.data, w, h, ch * w, QImage.Format.Format_RGB888)
+                # Create QImage (directly from OpenCV's BGR layout) and QPixmap
+                qt_image = QImage(img.data, w, h, img.strides[0], QImage.Format.Format_BGR888)
                 pixmap = QPixmap.fromImage(qt_image)
                 
                 # Scale the pixmap to fit the preview label
@@ -633,7 +700,8 @@ class FaceAnonymizationBatchApp(QMainWindow):
             "box_method": False,  # Default to ellipse masks (no checkbox)
             "draw_scores": False,  # Default to not drawing scores (no checkbox)
             "scale": self.scale_combo.currentText() if self.scale_combo.currentIndex() > 0 else "",
-            "blur_intensity": self.blur_intensity_slider.value() if self.anon_method.currentText() == "blur" else 5
+            "blur_intensity": self.blur_intensity_slider.value() if self.anon_method.currentText() == "blur" else 5,
+            "batch_size": 8  # Images per detection pass when a detection scale is set
         }
         
         # Log the output location strategy
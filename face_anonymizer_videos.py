@@ -1,30 +1,89 @@
 import platform
 import sys
 import os
+import shutil
 import subprocess
 from pathlib import Path
 import time
-import datetime
 import cv2
 import numpy as np
 import re
+from collections import OrderedDict
+from functools import lru_cache
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QLabel, QPushButton, QWidget,
                              QVBoxLayout, QHBoxLayout, QFileDialog, QSlider,
                             QProgressBar, QComboBox, QSpinBox, QCheckBox, QGroupBox,
-                            QRadioButton, QButtonGroup, QMessageBox, QPlainTextEdit,
-                            QListWidget, QListWidgetItem, QStackedWidget, QSizePolicy)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer, QSize
+                            QRadioButton, QButtonGroup, QMessageBox,
+                            QListView, QStackedWidget, QSizePolicy)
+from PyQt6.QtCore import (Qt, QThread, pyqtSignal, pyqtSlot, QTimer, QSize, QAbstractListModel, QModelIndex,
+                          QStringListModel, QObject, QFileInfo, QRunnable, QThreadPool)
 from PyQt6.QtGui import QImage, QPixmap, QColor, QFont, QIcon
 from centerface import CenterFace
 import deface
 import imageio
 import cv2
 
+# Processing options: (key, log label, default, only relevant for this anonymization method)
+_OPTION_SPEC = (
+    ("anonymization_method", "Anonymization method", "blur", None),
+    ("threshold", "Threshold", 0.2, None),
+    ("mask_scale", "Mask scale", 1.3, None),
+    ("box_method", "Box method", False, None),
+    ("draw_scores", "Draw scores", False, None),
+    ("mosaic_size", "Mosaic size", 20, "mosaic"),
+    ("blur_intensity", "Blur intensity", 5, "blur"),
+)
+
+
+def resolve_options(options):
+    """Return the processing options with defaults filled in for missing keys"""
+    return {key: options.get(key, default) for key, _, default, _ in _OPTION_SPEC}
+
+
+def format_options(options):
+    """Format resolved processing options as a multi-line log message"""
+    method = options["anonymization_method"]
+    lines = ["Processing parameters:"]
+    lines += [
+        f"  {label}: {options[key]}"
+        for key, label, _, only_for in _OPTION_SPEC
+        if only_for is None or only_for == method
+    ]
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=None)
+def _probe_tool(name, *args):
+    """Run an external tool once per process (e.g. to read its version), returns (ok, first output line)"""
+    path = shutil.which(name)  # Plain PATH lookup, avoids spawning a process for missing tools
+    if path is None:
+        return False, ""
+    try:
+        result = subprocess.run(
+            [path, *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=5
+        )
+    except (subprocess.SubprocessError, OSError):
+        return False, ""
+    lines = result.stdout.splitlines()
+    return result.returncode == 0, lines[0] if lines else ""
+
+
+# Minimum time between two live preview updates in the UI (seconds)
+PREVIEW_INTERVAL = 1 / 30
+# Number of lines kept in the log view
+MAX_LOG_LINES = 1000
+
+
 class VideoProcessingThread(QThread):
     """Thread for processing videos with deface without freezing the UI"""
     progress_updated = pyqtSignal(int)
-    frame_processed = pyqtSignal(QImage, int, int)  # current frame, current frame number, total frames
+    frame_processed = pyqtSignal(QImage)  # preview of the current processed frame
+    progress_tick = pyqtSignal(int, int)  # current frame number, total frames
     processing_finished = pyqtSignal(str)
     log_message = pyqtSignal(str)
     
@@ -34,11 +93,31 @@ class VideoProcessingThread(QThread):
         self.output_file = output_file
         self.options = options
         self.is_running = True
+        # Largest size of preview frames; the UI sets it to the size of its preview area before start()
+        self.preview_size = (640, 360)
+        # Two preview images used in turns, so the UI can show one while the next is filled
+        self.preview_images = None
+        self.preview_index = 0
+    
+    def next_preview_image(self, rgb_frame):
+        """Copy an RGB frame into the next reused preview QImage and return it"""
+        h, w = rgb_frame.shape[:2]
+        if self.preview_images is None or self.preview_images[0].size() != QSize(w, h):
+            self.preview_images = [QImage(w, h, QImage.Format.Format_RGB888) for _ in range(2)]
+        image = self.preview_images[self.preview_index]
+        self.preview_index ^= 1
+        # bits() detaches if the UI still holds this image, so a frame on screen is never overwritten
+        ptr = image.bits()
+        ptr.setsize(image.sizeInBytes())
+        rows = np.frombuffer(ptr, dtype=np.uint8).reshape(h, image.bytesPerLine())
+        rows[:, :w * 3].reshape(h, w, 3)[:] = rgb_frame
+        return image
     
     def run(self):
         try:
             # Check file size before processing
-            file_size_mb = os.path.getsize(self.input_file) / (1024 * 1024)
+            input_path = Path(self.input_file)
+            file_size_mb = input_path.stat().st_size / (1024 * 1024)
             if file_size_mb > 500:  # 500MB threshold
                 message = f"Large file detected ({file_size_mb:.1f} MB). Processing may take a long time."
                 self.log_message.emit(message)
@@ -53,20 +132,19 @@ class VideoProcessingThread(QThread):
                         return
 
             # Create output folder if it doesn't exist
-            output_dir = os.path.dirname(self.output_file)
-            if output_dir:
-                os.makedirs(output_dir, exist_ok=True)
+            Path(self.output_file).parent.mkdir(parents=True, exist_ok=True)
             
-            self.log_message.emit(f"Processing video: {os.path.basename(self.input_file)}")
+            self.log_message.emit(f"Processing video: {input_path.name}")
             
             # Configure options for deface module
-            threshold = self.options["threshold"]
-            mask_scale = self.options["mask_scale"]
-            replacewith = self.options["anonymization_method"]
-            ellipse = not self.options["box_method"]
-            draw_scores = self.options["draw_scores"]
-            mosaicsize = self.options["mosaic_size"] if "mosaic_size" in self.options else 20
-            blur_intensity = self.options["blur_intensity"] if "blur_intensity" in self.options else 5
+            options = resolve_options(self.options)
+            threshold = options["threshold"]
+            mask_scale = options["mask_scale"]
+            replacewith = options["anonymization_method"]
+            ellipse = not options["box_method"]
+            draw_scores = options["draw_scores"]
+            mosaicsize = options["mosaic_size"]
+            blur_intensity = options["blur_intensity"]
             
             # Prepare scale parameter
             scale = None
@@ -81,88 +159,34 @@ class VideoProcessingThread(QThread):
             # Create CenterFace instance
             centerface = CenterFace(in_shape=scale)
             
-            # Get total frames for progress tracking
-            try:
-                import cv2  # Make sure cv2 is imported here
-                cap = cv2.VideoCapture(self.input_file)
-                if not cap.isOpened():
-                    self.log_message.emit("Warning: Could not open input video file.")
-                    total_frames = 0
-                else:
-                    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                    if total_frames <= 0:
-                        self.log_message.emit("Warning: Could not determine total frames from metadata.")
-                        cap.set(cv2.CAP_PROP_POS_AVI_RATIO, 1)
-                        total_frames = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
-                        cap.set(cv2.CAP_PROP_POS_AVI_RATIO, 0)  # Reset to beginning
-                    
-                    if total_frames > 0:
-                        self.log_message.emit(f"Total frames in video: {total_frames}")
-                    else:
-                        self.log_message.emit("Warning: Unable to determine total frames. Progress will be estimated.")
-                        total_frames = 0
-                cap.release()
-            except Exception as e:
-                self.log_message.emit(f"Warning: Could not determine total frames. Progress may be inaccurate. Error: {str(e)}")
-                total_frames = 0
-            
-            # Log all parameters for debugging
-            self.log_message.emit(f"Processing parameters:")
-            self.log_message.emit(f"  Anonymization method: {replacewith}")
-            self.log_message.emit(f"  Threshold: {threshold}")
-            self.log_message.emit(f"  Mask scale: {mask_scale}")
-            self.log_message.emit(f"  Box method: {self.options['box_method']}")
-            self.log_message.emit(f"  Draw scores: {draw_scores}")
-            if replacewith == "mosaic":
-                self.log_message.emit(f"  Mosaic size: {mosaicsize}")
-            if replacewith == "blur":
-                self.log_message.emit(f"  Blur intensity: {blur_intensity}")
+            # Log all parameters for debugging (one message instead of one signal per line)
+            self.log_message.emit(format_options(options))
 
             # Process the video using imageio and deface directly
             try:
-                # Initialize video reader
-                reader = imageio.get_reader(self.input_file)
+                # Initialize video reader once; the dimensions come from the container metadata
+                reader = imageio.get_reader(self.input_file, input_params=deface.ffmpeg_decode_params())
                 meta = reader.get_meta_data()
                 fps = meta.get('fps', 30)
+                width, height = meta['size']
+                self.log_message.emit(f"Video dimensions: {width}x{height}")
                 
-                # Configure video writer with explicit orientation control
-                try:
-                    # Initialize video reader
-                    reader = imageio.get_reader(self.input_file)
-                    meta = reader.get_meta_data()
-                    fps = meta.get('fps', 30)
-                    
-                    # Get first frame to determine dimensions
-                    try:
-                        test_frame = reader.get_data(0)
-                        height, width = test_frame.shape[:2]
-                        self.log_message.emit(f"Video dimensions: {width}x{height}")
-                    except Exception as e:
-                        self.log_message.emit(f"Could not read first frame: {str(e)}")
-                        height, width = None, None
-                    
-                    # Close and reopen reader to start from beginning
-                    reader.close()
-                    reader = imageio.get_reader(self.input_file)
-                    
-                    # Configure ffmpeg options with explicit dimensions
-                    ffmpeg_config = {
-                        "codec": "libx264",
-                        "macro_block_size": 1,  # Set to 1 to avoid resizing
-                        "ffmpeg_log_level": "warning",
-                    }
-                    
-                    if height is not None and width is not None:
-                        ffmpeg_config["output_params"] = [
-                            "-pix_fmt", "yuv420p",
-                            "-vf", f"scale={width}:{height}"  # Ensure exact dimensions
-                        ]
-                except Exception as e:
-                    self.log_message.emit(f"Error configuring video dimensions: {str(e)}")
-                    ffmpeg_config = {"codec": "libx264"}
+                # Get total frames for progress tracking from the metadata ffmpeg already parsed
+                total_frames = deface.estimate_nframes(meta)
+                if total_frames is None:
+                    # Last resort: ask OpenCV for the container's frame count (no seek to the end)
+                    cap = deface.open_video_capture(self.input_file)
+                    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+                    cap.release()
+                if total_frames > 0:
+                    self.log_message.emit(f"Total frames in video: {total_frames}")
+                else:
+                    self.log_message.emit("Warning: Unable to determine total frames. Progress will be estimated.")
+                    total_frames = 0
                 
-                # Configure ffmpeg options
-                ffmpeg_config = {"codec": "libx264"}
+                # Configure ffmpeg options (hardware encoder if one works, libx264 otherwise)
+                ffmpeg_config = deface.get_optimized_ffmpeg_config()
+                ffmpeg_config["output_params"] = ffmpeg_config.get("output_params", []) + deface.ffmpeg_encode_params()
                 
                 # Initialize video writer
                 writer = imageio.get_writer(
@@ -173,32 +197,58 @@ class VideoProcessingThread(QThread):
                     **ffmpeg_config
                 )
                 
+                # Blur settings are the same for every frame and face, so compute and log them once
+                if replacewith == "blur":
+                    # Exponentially increased blur kernel size for much stronger effect
+                    blur_kernel_size = max(5, int(501 - (blur_intensity ** 4) * 0.05))
+                    # Make sure kernel size is odd
+                    if blur_kernel_size % 2 == 0:
+                        blur_kernel_size += 1
+                    # Apply multiple passes based on intensity (more passes for lower intensity values)
+                    additional_passes = max(1, 10 - blur_intensity)
+                    self.log_message.emit(f"Using {additional_passes+1} blur passes with kernel size {blur_kernel_size}")
+                    if blur_intensity <= 3:
+                        self.log_message.emit(f"Adding pixelation effect for maximum privacy")
+                
+                if replacewith == "blur" and ellipse:
+                    # Compile the masked copy kernel now rather than on the first face
+                    deface.warmup_kernels()
+                
                 # Process each frame
                 frame_count = 0
-                last_progress_update = time.time()
+                last_progress = -1
+                preview_buf = None
                 last_heartbeat = time.time()
                 
                 self.log_message.emit(f"Starting video processing with direct deface module integration...")
                 
-                for frame in reader:
+                # Decode on a background thread into a small bounded queue, so FFmpeg
+                # decoding overlaps with detection and anonymization of the previous batch
+                batch_size = 4  # Frames per detector forward pass
+                frames = deface.prefetch_iter(reader.iter_data(), maxsize=2 * batch_size)
+                
+                def detect_batches():
+                    # Detect faces in batch_size frames with a single forward pass, then hand them out one by one
+                    for batch in deface.batch_iter(frames, batch_size):
+                        dets_list, _ = centerface.infer_batch(batch, threshold=threshold)
+                        yield from zip(batch, dets_list)
+                
+                # The anonymization options are fixed for the whole video, pick the code path once
+                anonymize = deface.make_anonymizer(
+                    mask_scale=mask_scale,
+                    replacewith=replacewith, ellipse=ellipse, 
+                    draw_scores=draw_scores, replaceimg=None, 
+                    mosaicsize=mosaicsize
+                )
+                
+                for frame, dets in detect_batches():
                     if not self.is_running:
                         self.log_message.emit("Processing stopped by user")
                         break
                     
-                    # Detect faces using centerface
-                    dets, _ = centerface(frame, threshold=threshold)
-                    
                     # Anonymize faces
                     if replacewith == "blur":
                         # For blur method, handle intensity directly
-                        # Exponentially increased blur kernel size for much stronger effect
-                        blur_kernel_size = max(5, int(501 - (blur_intensity ** 4) * 0.05))
-                        # Make sure kernel size is odd
-                        if blur_kernel_size % 2 == 0:
-                            blur_kernel_size += 1
-                        
-                        self.log_message.emit(f"Using blur kernel size: {blur_kernel_size}")
-                        
                         # Process each detected face
                         for det in dets:
                             x1, y1, x2, y2, _ = det
@@ -228,8 +278,6 @@ class VideoProcessingThread(QThread):
                             # Apply blur with appropriate kernel size
                             blurred_face = cv2.GaussianBlur(face_region, (blur_kernel_size, blur_kernel_size), 0)
                             
-                            # Apply multiple passes based on intensity (more passes for lower intensity values)
-                            additional_passes = max(1, 10 - blur_intensity)
                             for _ in range(additional_passes):
                                 blurred_face = cv2.GaussianBlur(blurred_face, (blur_kernel_size, blur_kernel_size), 0)
 
@@ -241,32 +289,17 @@ class VideoProcessingThread(QThread):
                                 temp = cv2.resize(blurred_face, (width // pixel_size, height // pixel_size), 
                                                   interpolation=cv2.INTER_LINEAR)
                                 blurred_face = cv2.resize(temp, (width, height), interpolation=cv2.INTER_NEAREST)
-                                
-                            self.log_message.emit(f"Applied {additional_passes+1} blur passes with kernel size {blur_kernel_size}")
-                            if blur_intensity <= 3:
-                                self.log_message.emit(f"Added pixelation effect for maximum privacy")
                             
                             # Replace region in the frame
                             if ellipse:
-                                # Create a mask for elliptical blur
+                                # Elliptical mask of the region (cached per size by deface)
                                 mask_height, mask_width = y2_scaled-y1_scaled, x2_scaled-x1_scaled
-                                mask = np.zeros((mask_height, mask_width), dtype=np.uint8)
                                 
-                                # Draw ellipse on the mask
                                 try:
-                                    center = (mask_width // 2, mask_height // 2)
-                                    axes = (int(mask_width // 2 * 0.95), int(mask_height // 2 * 0.95))
-                                    cv2.ellipse(mask, center, axes, 0, 0, 360, 255, -1)
-                                    
-                                    # Expand mask to match face_region channels
-                                    mask_3d = np.repeat(mask[:, :, np.newaxis], 3, axis=2)
+                                    mask = deface.ellipse_mask(mask_height, mask_width)
                                     
-                                    # Apply elliptical blur
-                                    frame[y1_scaled:y2_scaled, x1_scaled:x2_scaled] = np.where(
-                                        mask_3d > 0, 
-                                        blurred_face, 
-                                        frame[y1_scaled:y2_scaled, x1_scaled:x2_scaled]
-                                    )
+                                    # Apply elliptical blur in place, without 3-channel mask or np.where temporaries
+                                    deface._copy_masked(frame[y1_scaled:y2_scaled, x1_scaled:x2_scaled], blurred_face, mask)
                                 except Exception as e:
                                     # Fallback to rectangular blur if ellipse fails
                                     self.log_message.emit(f"Ellipse error: {str(e)}, falling back to rectangle")
@@ -275,13 +308,8 @@ class VideoProcessingThread(QThread):
                                 # Apply rectangular blur
                                 frame[y1_scaled:y2_scaled, x1_scaled:x2_scaled] = blurred_face
                     else:
-                        # For other methods, use the standard anonymize_frame
-                        deface.anonymize_frame(
-                            dets, frame, mask_scale=mask_scale,
-                            replacewith=replacewith, ellipse=ellipse, 
-                            draw_scores=draw_scores, replaceimg=None, 
-                            mosaicsize=mosaicsize
-                        )
+                        # For other methods, use deface's anonymization
+                        anonymize(dets, frame)
                     
                     # Write the processed frame
                     writer.append_data(frame)
@@ -295,32 +323,41 @@ class VideoProcessingThread(QThread):
                         last_heartbeat = current_time
                         self.log_message.emit(f"Still processing... (current frame: {frame_count})")
                     
-                    # Update progress bar roughly every second
-                    if current_time - last_progress_update > 1.0:
-                        last_progress_update = current_time
-                        
-                        # Update UI with progress
-                        if total_frames > 0:
-                            progress = min(int((frame_count / total_frames) * 100), 99)
+                    # Update progress bar only when the percentage changes
+                    if total_frames > 0:
+                        progress = min(int((frame_count / total_frames) * 100), 99)
+                        if progress != last_progress:
+                            last_progress = progress
                             self.progress_updated.emit(progress)
-                        
-                        # Log frame info (less frequently)
-                        if frame_count % 100 == 0:
-                            if total_frames > 0:
-                                self.log_message.emit(f"Processing frame: {frame_count}/{total_frames} " +
-                                                    f"({(frame_count/total_frames*100):.1f}%)")
-                            else:
-                                self.log_message.emit(f"Processing frame: {frame_count}")
+                            self.progress_tick.emit(frame_count, total_frames)
+                    
+                    # Log frame info (less frequently)
+                    if frame_count % 100 == 0:
+                        if total_frames > 0:
+                            self.log_message.emit(f"Processing frame: {frame_count}/{total_frames} " +
+                                                f"({(frame_count/total_frames*100):.1f}%)")
+                        else:
+                            self.log_message.emit(f"Processing frame: {frame_count}")
                     
                     # Send frame for preview (every 5th frame to avoid GUI slowdown)
                     if frame_count % 5 == 0:
+                        # Downscale to the preview size here, so the UI thread gets frames it can show as they are
                         h, w = frame.shape[:2]
-                        rgb_frame = frame  # imageio already gives us RGB format
-                        bytes_per_line = 3 * w
-                        qt_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-                        self.frame_processed.emit(qt_image, frame_count, total_frames)
+                        max_w, max_h = self.preview_size
+                        preview_scale = min(max_w / w, max_h / h)
+                        if preview_scale < 1:
+                            preview_size = (max(1, round(w * preview_scale)), max(1, round(h * preview_scale)))
+                            # Resize into the same buffer every time instead of allocating one per preview
+                            if preview_buf is None or preview_buf.shape[1::-1] != preview_size:
+                                preview_buf = np.empty((preview_size[1], preview_size[0], 3), dtype=np.uint8)
+                            rgb_frame = cv2.resize(frame, preview_size, dst=preview_buf, interpolation=cv2.INTER_AREA)
+                        else:
+                            rgb_frame = frame  # imageio already gives us RGB format
+                        qt_image = self.next_preview_image(rgb_frame)
+                        self.frame_processed.emit(qt_image)
                 
                 # Close reader and writer
+                frames.close()
                 reader.close()
                 writer.close()
                 
@@ -352,6 +389,30 @@ class VideoProcessingThread(QThread):
         """Stop the processing"""
         self.is_running = False
 
+
+_START_BUTTON_QSS = """
+    QPushButton {
+        background-color: #4CAF50;
+        color: white;
+        border-radius: 5px;
+    }
+    QPushButton:hover {
+        background-color: #45a049;
+    }
+"""
+
+
+@lru_cache(maxsize=None)
+def _welcome_fonts():
+    """Title, subtitle and button fonts of the welcome screen, built once (QFont needs a running QApplication)"""
+    title_font = QFont()
+    title_font.setPointSize(24)
+    title_font.setBold(True)
+    subtitle_font = QFont()
+    subtitle_font.setPointSize(12)
+    return title_font, subtitle_font, QFont("Arial", 14)
+
+
 class WelcomeScreen(QWidget):
     """Welcome screen widget that appears when the app launches"""
     def __init__(self, parent=None):
@@ -360,23 +421,19 @@ class WelcomeScreen(QWidget):
         
     def init_ui(self):
         layout = QVBoxLayout()
+        title_font, subtitle_font, button_font = _welcome_fonts()
         
         # Add some spacing at the top
         layout.addSpacing(40)
         
         # Title label
         title_label = QLabel("Face Anonymization Tool")
-        title_font = QFont()
-        title_font.setPointSize(24)
-        title_font.setBold(True)
         title_label.setFont(title_font)
         title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(title_label)
         
         # Subtitle
         subtitle_label = QLabel("Powered by deface library")
-        subtitle_font = QFont()
-        subtitle_font.setPointSize(12)
         subtitle_label.setFont(subtitle_font)
         subtitle_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(subtitle_label)
@@ -397,17 +454,8 @@ class WelcomeScreen(QWidget):
         # Get started button
         self.start_button = QPushButton("Get Started")
         self.start_button.setMinimumSize(200, 50)
-        self.start_button.setFont(QFont("Arial", 14))
-        self.start_button.setStyleSheet("""
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
-                border-radius: 5px;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-        """)
+        self.start_button.setFont(button_font)
+        self.start_button.setStyleSheet(_START_BUTTON_QSS)
         
         # Center the button
         button_layout = QHBoxLayout()
@@ -425,6 +473,260 @@ class WelcomeScreen(QWidget):
         self.setLayout(layout)
 
 
+def scaled_bgr_image(frame, size):
+    """Scale an OpenCV BGR frame to fit size, as a QImage that owns its pixels (no cvtColor needed)"""
+    h, w = frame.shape[:2]
+    qt_image = QImage(frame.data, w, h, frame.strides[0], QImage.Format.Format_BGR888)
+    scaled_image = qt_image.scaled(size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+    # scaled() returns a shallow copy if the frame already fits, which would still point into frame
+    return scaled_image if scaled_image.size() != qt_image.size() else qt_image.copy()
+
+
+def load_video_thumbnail(video_path, size, use_ffmpeg, log):
+    """Load a thumbnail of the video scaled to fit size and log its properties.
+
+    Returns (image, error); image is None and error a message for the preview label on failure.
+    Only uses thread-safe QImage operations, so it can run on a thread pool.
+    """
+    try:
+        ffmpeg_image = None  # Thumbnail from ffmpeg, if ffprobe fails OpenCV only reads the properties
+        # Try using ffmpeg to get a thumbnail if available (to handle corrupt headers)
+        try:
+            # First attempt: try to use ffmpeg directly if available
+            if not use_ffmpeg:
+                raise FileNotFoundError("ffmpeg not found")
+            thumbnail_path = os.path.join(os.path.dirname(video_path), f"temp_thumbnail_{time.time_ns()}.jpg")  # Unique per call, tasks can run concurrently
+            result = subprocess.run(
+                ["ffmpeg", "-y", "-i", video_path, "-ss", "00:00:01", "-vframes", "1", thumbnail_path],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                timeout=5
+            )
+
+            # A single stat() tells us both whether ffmpeg wrote the file and whether it is empty
+            try:
+                thumbnail_size = os.stat(thumbnail_path).st_size
+            except OSError:
+                thumbnail_size = 0
+            if thumbnail_size > 0:
+                # Load the thumbnail
+                frame = cv2.imread(thumbnail_path)
+                if frame is not None:
+                    # Display OpenCV's BGR layout directly
+                    scaled_image = scaled_bgr_image(frame, size)
+                    ffmpeg_image = scaled_image
+
+                    # Clean up
+                    try:
+                        os.remove(thumbnail_path)
+                    except:
+                        pass
+
+                    # Get video info using ffprobe
+                    try:
+                        result = subprocess.run(
+                            ["ffprobe", "-v", "error", "-select_streams", "v:0", 
+                             "-show_entries", "stream=width,height,avg_frame_rate,nb_frames", 
+                             "-of", "csv=p=0", video_path],
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE,
+                            text=True,
+                            timeout=5
+                        )
+
+                        if result.returncode == 0 and result.stdout:
+                            info = result.stdout.strip().split(',')
+                            if len(info) >= 4:
+                                width, height, fps_str, frame_count = info
+
+                                # Parse FPS (can be in form "30000/1001")
+                                try:
+                                    if '/' in fps_str:
+                                        num, den = map(float, fps_str.split('/'))
+                                        fps = num / den if den else 0
+                                    else:
+                                        fps = float(fps_str)
+                                except:
+                                    fps = 0
+
+                                # Log video properties
+                                duration_sec = int(frame_count) / fps if fps > 0 and frame_count and frame_count != 'N/A' else 0
+                                duration_str = time.strftime('%H:%M:%S', time.gmtime(duration_sec))
+
+                                log(f"Video properties (from ffprobe):")
+                                log(f"  Resolution: {width}x{height}")
+                                log(f"  FPS: {fps:.2f}")
+
+                                if frame_count and frame_count != 'N/A':
+                                    log(f"  Duration: {duration_str} ({frame_count} frames)")
+                                else:
+                                    log(f"  Duration: Unknown (frame count not available)")
+
+                                return scaled_image, None  # Success with ffmpeg/ffprobe
+                    except Exception as e:
+                        log(f"Error getting video info with ffprobe: {str(e)}")
+
+        except (subprocess.SubprocessError, FileNotFoundError, Exception) as e:
+            log(f"Could not use ffmpeg for thumbnail: {str(e)}")
+
+        # Fallback to OpenCV if ffmpeg failed
+        cap = deface.open_video_capture(video_path)
+        try:
+            if not cap.isOpened():
+                log("Warning: OpenCV could not open the video file. The file may be corrupted or use an unsupported codec.")
+                return None, "Could not load video preview\nTry a different video format or check if the file is corrupted"
+
+            # Only decode a frame if ffmpeg did not already give us the thumbnail
+            if ffmpeg_image is None:
+                ret, frame = cap.read()
+                if not ret:
+                    log("Warning: Could not read the first frame of the video.")
+                    return None, "Could not read video frame\nThe file may be corrupted"
+
+            # Get video properties
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        finally:
+            cap.release()
+
+        # Log video properties
+        duration_sec = frame_count / fps if fps > 0 and frame_count > 0 else 0
+        duration_str = time.strftime('%H:%M:%S', time.gmtime(duration_sec))
+
+        log(f"Video properties (from OpenCV):")
+        log(f"  Resolution: {width}x{height}")
+        log(f"  FPS: {fps}")
+
+        if frame_count > 0:
+            log(f"  Duration: {duration_str} ({frame_count} frames)")
+        else:
+            log(f"  Duration: Unknown (frame count not available)")
+
+        if ffmpeg_image is not None:
+            return ffmpeg_image, None
+
+        # Create QImage (directly from OpenCV's BGR layout) and scale it to fit the preview label
+        return scaled_bgr_image(frame, size), None
+
+    except Exception as e:
+        log(f"Error showing video thumbnail: {str(e)}")
+        return None, "Could not load video preview\nThe file may be corrupted or in an unsupported format"
+
+
+class ThumbnailSignals(QObject):
+    """Signals of ThumbnailTask, which as a QRunnable cannot have signals itself"""
+    finished = pyqtSignal(object, object, str, list)  # cache key, QImage or None, error message, log lines
+
+
+class ThumbnailTask(QRunnable):
+    """Load a video thumbnail and its properties on the thread pool instead of the GUI thread"""
+    def __init__(self, key, size, use_ffmpeg, signals):
+        super().__init__()
+        self.key = key
+        self.size = size
+        self.use_ffmpeg = use_ffmpeg
+        self.signals = signals
+
+    def run(self):
+        log_lines = []
+        image, error = load_video_thumbnail(self.key[0], self.size, self.use_ffmpeg, log_lines.append)
+        self.signals.finished.emit(self.key, image, error or "", log_lines)
+
+
+class BatchModel(QAbstractListModel):
+    """List model of the videos queued for batch processing and their processing state"""
+    PENDING, PROCESSING, DONE, FAILED = range(4)
+    STATE_COLORS = {
+        PROCESSING: QColor(255, 255, 200),  # Light yellow
+        DONE: QColor(200, 255, 200),  # Light green
+        FAILED: QColor(255, 200, 200),  # Light red
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Rows are (folder, file name) pairs; videos from the same folder share one folder string
+        self.entries = []
+        self.states = []
+        self.entry_set = set()  # For constant time duplicate checks
+        self.folders = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def path(self, row):
+        return os.path.join(*self.entries[row])
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.entries[row][1]
+        if role == Qt.ItemDataRole.UserRole:
+            return self.path(row)
+        if role == Qt.ItemDataRole.BackgroundRole:
+            return self.STATE_COLORS.get(self.states[row])
+        return None
+
+    def add_paths(self, paths):
+        """Append the paths that are not queued yet in a single insert, returns how many were added"""
+        new_entries = []
+        for path in paths:
+            folder, name = os.path.split(path)
+            entry = (self.folders.setdefault(folder, folder), name)
+            if entry not in self.entry_set:
+                self.entry_set.add(entry)
+                new_entries.append(entry)
+        if new_entries:
+            first = len(self.entries)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_entries) - 1)
+            self.entries.extend(new_entries)
+            self.states.extend([self.PENDING] * len(new_entries))
+            self.endInsertRows()
+        return len(new_entries)
+
+    def removeRows(self, row, count, parent=QModelIndex()):
+        if parent.isValid() or count <= 0 or row < 0 or row + count > len(self.entries):
+            return False
+        self.beginRemoveRows(parent, row, row + count - 1)
+        self.entry_set.difference_update(self.entries[row:row + count])
+        del self.entries[row:row + count]
+        del self.states[row:row + count]
+        self.endRemoveRows()
+        return True
+
+    def moveRows(self, source_parent, source_row, count, destination_parent, destination_child):
+        if (source_parent.isValid() or destination_parent.isValid() or count <= 0
+                or source_row < 0 or source_row + count > len(self.entries)
+                or not 0 <= destination_child <= len(self.entries)):
+            return False
+        # beginMoveRows refuses moves into or right after the moved block
+        if not self.beginMoveRows(source_parent, source_row, source_row + count - 1, destination_parent, destination_child):
+            return False
+        insert_at = destination_child if destination_child < source_row else destination_child - count
+        for rows in (self.entries, self.states):
+            block = rows[source_row:source_row + count]
+            del rows[source_row:source_row + count]
+            rows[insert_at:insert_at] = block
+        self.endMoveRows()
+        return True
+
+    def clear(self):
+        self.beginResetModel()
+        self.entries.clear()
+        self.states.clear()
+        self.entry_set.clear()
+        self.folders.clear()
+        self.endResetModel()
+
+    def set_state(self, row, state):
+        self.states[row] = state
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.BackgroundRole])
+
+
 class FaceAnonymizationVideoApp(QMainWindow):
     """Main application window for processing videos using deface library"""
     def __init__(self):
@@ -448,18 +750,24 @@ class FaceAnonymizationVideoApp(QMainWindow):
             # Don't exit - we can still use the module even if we can't get its version
             
         # Also check for ffmpeg (optional but helpful)
-        self.has_ffmpeg = False
-        try:
-            result = subprocess.run(
-                ["ffmpeg", "-version"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            if result.returncode == 0:
-                self.has_ffmpeg = True
-        except (subprocess.SubprocessError, FileNotFoundError):
-            pass
+        self.has_ffmpeg, _ = _probe_tool("ffmpeg", "-version")
+        
+        # Thumbnails and logged properties of previewed videos, keyed by (path, mtime, size)
+        self.thumbnail_cache = OrderedDict()
+        # Thumbnails are loaded on the thread pool, see show_video_thumbnail
+        self.thumbnail_key = None  # Cache key of the video whose thumbnail should be shown
+        self.pending_thumbnails = set()
+        self.thumbnail_signals = ThumbnailSignals(self)
+        self.thumbnail_signals.finished.connect(self.thumbnail_loaded)
+        # Log messages waiting to be appended to the log view
+        self.pending_log_lines = []
+        # Fitted size of live preview frames, for the (label size, frame size) in preview_fit_key
+        self.preview_fit_key = None
+        self.preview_fit_size = None
+        # Live preview throttling, see update_frame_preview
+        self.pending_preview = None
+        self.last_preview_time = 0.0
+        self.last_preview_key = None
         
         # Create stacked widget for different screens
         self.stacked_widget = QStackedWidget()
@@ -522,8 +830,15 @@ class FaceAnonymizationVideoApp(QMainWindow):
         # Add a batch processing list widget
         batch_layout = QVBoxLayout()
         batch_layout.addWidget(QLabel("Batch Processing Queue:"))
-        self.batch_list = QListWidget()
-        self.batch_list.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
+        self.batch_model = BatchModel(self)
+        self.batch_list = QListView()
+        self.batch_list.setModel(self.batch_model)
+        self.batch_list.setSelectionMode(QListView.SelectionMode.ExtendedSelection)
+        # All rows are single lines of text, so one size hint serves every row;
+        # very long queues are laid out in batches instead of all at once
+        self.batch_list.setUniformItemSizes(True)
+        self.batch_list.setLayoutMode(QListView.LayoutMode.Batched)
+        self.batch_list.setBatchSize(100)
         self.batch_list.setMinimumHeight(100)
         batch_layout.addWidget(self.batch_list)
         
@@ -685,15 +1000,17 @@ class FaceAnonymizationVideoApp(QMainWindow):
         # Log area
         log_group = QGroupBox("Log")
         log_layout = QVBoxLayout()
-        self.log_text = QPlainTextEdit()
-        self.log_text.setReadOnly(True)
-        self.log_text.setMaximumBlockCount(1000)  # Limit to prevent memory issues
-        self.log_text.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
-        log_layout.addWidget(self.log_text)
+        # One row per log line: appending a row is cheap, unlike a text layout pass per appended line
+        self.log_model = QStringListModel(self)
+        self.log_view = QListView()
+        self.log_view.setModel(self.log_model)
+        self.log_view.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        self.log_view.setUniformItemSizes(True)
+        log_layout.addWidget(self.log_view)
         
         # Clear log button
         clear_log_btn = QPushButton("Clear Log")
-        clear_log_btn.clicked.connect(self.log_text.clear)
+        clear_log_btn.clicked.connect(lambda: self.log_model.setStringList([]))
         log_layout.addWidget(clear_log_btn)
         log_group.setLayout(log_layout)
         
@@ -708,6 +1025,15 @@ class FaceAnonymizationVideoApp(QMainWindow):
         # Set main layout
         self.main_app_widget.setLayout(main_layout)
         
+        # Widgets that are locked while videos are being processed
+        self.processing_widgets = [
+            self.browse_output_btn, self.browse_multiple_btn, self.anon_method, self.mosaic_size,
+            self.threshold_slider, self.mask_scale_slider, self.scale_combo, self.blur_intensity_slider,
+            # Batch controls
+            self.remove_selected_btn, self.clear_batch_btn, self.move_up_btn, self.move_down_btn,
+            self.batch_list,
+        ]
+        
         # Log application startup
         self.append_log(f"Video Face Anonymization App started (powered by deface {self.deface_version})")
         self.append_log("Ready to process videos")
@@ -718,9 +1044,8 @@ class FaceAnonymizationVideoApp(QMainWindow):
             self, "Select Input Videos", "", "Video Files (*.mp4 *.avi *.mov *.mkv *.webm);;All Files (*.*)"
         )
         if file_paths:
-            # Add the files to the batch processing list
-            for file_path in file_paths:
-                self.add_to_batch(file_path)
+            # Add the files to the batch processing list, as a single model insert
+            self.batch_model.add_paths(file_paths)
             
             self.append_log(f"Added {len(file_paths)} videos to batch processing queue")
             
@@ -731,55 +1056,48 @@ class FaceAnonymizationVideoApp(QMainWindow):
     
     def add_to_batch(self, file_path):
         """Add a file to the batch processing list"""
-        # Check if the file is already in the list
-        for i in range(self.batch_list.count()):
-            item = self.batch_list.item(i)
-            if item.data(Qt.ItemDataRole.UserRole) == file_path:
-                # Already exists
-                return
-        
-        # Add the file to the list
-        item = QListWidgetItem(os.path.basename(file_path))
-        item.setData(Qt.ItemDataRole.UserRole, file_path)
-        self.batch_list.addItem(item)
+        # Files that are already in the list are skipped
+        self.batch_model.add_paths([file_path])
     
     def remove_selected_videos(self):
         """Remove selected videos from the batch list"""
-        selected_items = self.batch_list.selectedItems()
-        if not selected_items:
+        selected_rows = sorted(
+            (index.row() for index in self.batch_list.selectionModel().selectedIndexes()),
+            reverse=True
+        )
+        if not selected_rows:
             return
         
-        for item in selected_items:
-            row = self.batch_list.row(item)
-            self.batch_list.takeItem(row)
+        # Remove from the bottom up so the remaining row numbers stay valid
+        for row in selected_rows:
+            self.batch_model.removeRow(row)
         
-        self.append_log(f"Removed {len(selected_items)} video(s) from batch queue")
+        self.append_log(f"Removed {len(selected_rows)} video(s) from batch queue")
         self.update_batch_process_button()
     
     def clear_batch(self):
         """Clear all videos from the batch list"""
-        count = self.batch_list.count()
+        count = self.batch_model.rowCount()
         if count > 0:
-            self.batch_list.clear()
+            self.batch_model.clear()
             self.append_log(f"Cleared all {count} videos from batch queue")
             self.progress_bar.setValue(0)
             self.update_batch_process_button()
     
     def move_item_up(self):
         """Move the selected item up in the batch list"""
-        current_row = self.batch_list.currentRow()
+        current_row = self.batch_list.currentIndex().row()
         if current_row > 0:
-            item = self.batch_list.takeItem(current_row)
-            self.batch_list.insertItem(current_row - 1, item)
-            self.batch_list.setCurrentItem(item)
+            self.batch_model.moveRow(QModelIndex(), current_row, QModelIndex(), current_row - 1)
+            self.batch_list.setCurrentIndex(self.batch_model.index(current_row - 1))
     
     def move_item_down(self):
         """Move the selected item down in the batch list"""
-        current_row = self.batch_list.currentRow()
-        if current_row < self.batch_list.count() - 1:
-            item = self.batch_list.takeItem(current_row)
-            self.batch_list.insertItem(current_row + 1, item)
-            self.batch_list.setCurrentItem(item)
+        current_row = self.batch_list.currentIndex().row()
+        if 0 <= current_row < self.batch_model.rowCount() - 1:
+            # The destination row is counted before the move, hence + 2
+            self.batch_model.moveRow(QModelIndex(), current_row, QModelIndex(), current_row + 2)
+            self.batch_list.setCurrentIndex(self.batch_model.index(current_row + 1))
     
     def browse_output_folder(self):
         """Open folder dialog to select output directory"""
@@ -788,13 +1106,13 @@ class FaceAnonymizationVideoApp(QMainWindow):
         )
         if folder_path:
             self.output_file = folder_path
-            self.output_path_label.setText(os.path.basename(folder_path))
+            self.output_path_label.setText(QFileInfo(folder_path).fileName())
             self.append_log(f"Output folder set to: {folder_path}")
             self.update_batch_process_button()
     
     def update_batch_process_button(self):
         """Update the batch process button state based on list and output folder"""
-        has_videos = self.batch_list.count() > 0
+        has_videos = self.batch_model.rowCount() > 0
         has_output = bool(self.output_file)
         
         self.batch_process_btn.setEnabled(has_videos and has_output)
@@ -805,7 +1123,7 @@ class FaceAnonymizationVideoApp(QMainWindow):
             self.stop_processing()
             return
         
-        if self.batch_list.count() == 0:
+        if self.batch_model.rowCount() == 0:
             QMessageBox.warning(self, "No Videos", "No videos in the batch processing queue.")
             return
         
@@ -827,25 +1145,27 @@ class FaceAnonymizationVideoApp(QMainWindow):
     
     def process_next_batch_video(self):
         """Process the next video in the batch queue"""
-        if not self.is_processing or self.current_batch_index >= self.batch_list.count():
+        total_count = self.batch_model.rowCount()
+        if not self.is_processing or self.current_batch_index >= total_count:
             # We're done or stopped
             self.batch_processing_complete()
             return
         
         # Get the next video from the queue
-        item = self.batch_list.item(self.current_batch_index)
-        input_file = item.data(Qt.ItemDataRole.UserRole)
+        input_file = self.batch_model.path(self.current_batch_index)
         
         # Set the item background to indicate it's being processed
-        item.setBackground(QColor(255, 255, 200))  # Light yellow
-        self.batch_list.scrollToItem(item)
+        self.batch_model.set_state(self.current_batch_index, BatchModel.PROCESSING)
+        self.batch_list.scrollTo(self.batch_model.index(self.current_batch_index))
         
         # Generate output filename
-        input_name = os.path.basename(input_file)
-        input_base = os.path.splitext(input_name)[0]
-        input_ext = os.path.splitext(input_name)[1]
+        input_info = QFileInfo(input_file)
+        input_name = input_info.fileName()
+        input_base = input_info.completeBaseName()
+        input_ext = f".{input_info.suffix()}" if input_info.suffix() else ""
+        output_folder = self.output_file  # In batch mode output_file is the output folder
         output_file = os.path.join(
-            self.output_file,
+            output_folder,
             f"{input_base}_anonymized{input_ext}"
         )
         
@@ -854,11 +1174,11 @@ class FaceAnonymizationVideoApp(QMainWindow):
         self.output_file_current = output_file  # Store current output file separately
         
         # Update labels
-        self.input_path_label.setText(os.path.basename(input_file))
-        self.status_label.setText(f"Processing video {self.current_batch_index + 1} of {self.batch_list.count()}")
+        self.input_path_label.setText(input_name)
+        self.status_label.setText(f"Processing video {self.current_batch_index + 1} of {total_count}")
         
         # Log
-        self.append_log(f"Batch processing: Starting video {self.current_batch_index + 1} of {self.batch_list.count()}")
+        self.append_log(f"Batch processing: Starting video {self.current_batch_index + 1} of {total_count}")
         self.append_log(f"Input: {input_file}")
         self.append_log(f"Output: {output_file}")
         
@@ -890,35 +1210,41 @@ class FaceAnonymizationVideoApp(QMainWindow):
         # Connect signals
         self.processing_thread.progress_updated.connect(self.update_progress)
         self.processing_thread.frame_processed.connect(self.update_frame_preview)
+        self.processing_thread.progress_tick.connect(self.update_progress_tick)
         self.processing_thread.processing_finished.connect(self.batch_video_finished)
         self.processing_thread.log_message.connect(self.append_log)
         
         # Start processing
+        self.processing_thread.preview_size = self.preview_area_size()
         self.processing_thread.start()
         
         # Enable force stop button
         self.force_stop_btn.setEnabled(True)
     
+    @pyqtSlot(str)
     def batch_video_finished(self, message):
         """Handle when a video in the batch is finished"""
         # Mark the current video as done
-        if 0 <= self.current_batch_index < self.batch_list.count():
-            item = self.batch_list.item(self.current_batch_index)
+        if 0 <= self.current_batch_index < self.batch_model.rowCount():
+            file_name = self.batch_model.entries[self.current_batch_index][1]
             if "completed" in message.lower():
                 # Success
-                item.setBackground(QColor(200, 255, 200))  # Light green
-                self.append_log(f"Successfully processed: {os.path.basename(item.data(Qt.ItemDataRole.UserRole))}")
+                self.batch_model.set_state(self.current_batch_index, BatchModel.DONE)
+                self.append_log(f"Successfully processed: {file_name}")
             else:
                 # Error
-                item.setBackground(QColor(255, 200, 200))  # Light red
-                self.append_log(f"Failed to process: {os.path.basename(item.data(Qt.ItemDataRole.UserRole))}")
+                self.batch_model.set_state(self.current_batch_index, BatchModel.FAILED)
+                self.append_log(f"Failed to process: {file_name}")
         
         # Move to the next video
         self.current_batch_index += 1
         
-        if self.is_processing and self.current_batch_index < self.batch_list.count():
-            # Process the next video
-            QTimer.singleShot(1000, self.process_next_batch_video)  # Add a small delay between videos
+        if self.is_processing and self.current_batch_index < self.batch_model.rowCount():
+            # The worker emits its result as the last step of run(), so this returns almost at once;
+            # it keeps the finished thread alive until it has really exited before it is replaced
+            self.processing_thread.wait(5000)
+            # Process the next video on the next event loop pass, after the list has repainted
+            QTimer.singleShot(0, self.process_next_batch_video)
         else:
             # Batch processing complete
             self.batch_processing_complete()
@@ -938,7 +1264,7 @@ class FaceAnonymizationVideoApp(QMainWindow):
         # Display results
         if self.current_batch_index > 0:
             processed_count = self.current_batch_index
-            total_count = self.batch_list.count()
+            total_count = self.batch_model.rowCount()
             remaining = total_count - processed_count
             
             status_msg = f"Batch processing complete. Processed {processed_count} of {total_count} videos."
@@ -954,6 +1280,7 @@ class FaceAnonymizationVideoApp(QMainWindow):
         # Reset batch index
         self.current_batch_index = -1
         
+    @pyqtSlot(str)
     def processing_finished(self, message):
         """Handle the end of processing for single video mode"""
         self.is_processing = False
@@ -990,22 +1317,13 @@ class FaceAnonymizationVideoApp(QMainWindow):
     # Update the disable_ui method to also disable batch controls
     def disable_ui_during_processing(self, disable):
         """Enable/disable UI elements during processing"""
-        # self.browse_input_btn.setEnabled(not disable)
-        self.browse_output_btn.setEnabled(not disable)
-        self.browse_multiple_btn.setEnabled(not disable)
-        self.anon_method.setEnabled(not disable)
-        self.mosaic_size.setEnabled(not disable)
-        self.threshold_slider.setEnabled(not disable)
-        self.mask_scale_slider.setEnabled(not disable)
-        self.scale_combo.setEnabled(not disable)
-        self.blur_intensity_slider.setEnabled(not disable)
-
-        # Disable batch control buttons as well
-        self.remove_selected_btn.setEnabled(not disable)
-        self.clear_batch_btn.setEnabled(not disable)
-        self.move_up_btn.setEnabled(not disable)
-        self.move_down_btn.setEnabled(not disable)
-        self.batch_list.setEnabled(not disable)
+        # Repaint once after all widgets changed instead of once per widget
+        self.main_app_widget.setUpdatesEnabled(False)
+        try:
+            for widget in self.processing_widgets:
+                widget.setEnabled(not disable)
+        finally:
+            self.main_app_widget.setUpdatesEnabled(True)
 
     def update_ui_based_on_method(self, method):
         """Show/hide UI elements based on the selected anonymization method"""
@@ -1043,154 +1361,81 @@ class FaceAnonymizationVideoApp(QMainWindow):
         self.blur_intensity_value_label.setText(f"{value}")
         self.blur_intensity_value_label.setStyleSheet("font-weight: bold;")
     
+    @pyqtSlot(str)
     def append_log(self, message):
         """Add a message to the log with timestamp"""
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S.%f")[:-3]
-        formatted_msg = f"[{timestamp}] {message}"
-        self.log_text.appendPlainText(formatted_msg)
-        
-        # Auto-scroll to bottom
-        self.log_text.verticalScrollBar().setValue(
-            self.log_text.verticalScrollBar().maximum()
-        )
+        now = time.time()
+        timestamp = time.strftime("%H:%M:%S", time.localtime(now))
+        self.pending_log_lines.append(f"[{timestamp}.{int(now % 1 * 1000):03d}] {message}")
+        # Messages that arrive in the same event loop pass are appended in one go
+        if len(self.pending_log_lines) == 1:
+            QTimer.singleShot(0, self.flush_log)
+    
+    def flush_log(self):
+        """Append the buffered log messages to the log view"""
+        lines, self.pending_log_lines = self.pending_log_lines, []
+        if not lines:
+            return
+        # Only follow new lines if the user has not scrolled up to read older ones
+        scroll_bar = self.log_view.verticalScrollBar()
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum() - 4
+        
+        first = self.log_model.rowCount()
+        self.log_model.insertRows(first, len(lines))
+        for row, line in enumerate(lines, first):
+            self.log_model.setData(self.log_model.index(row), line)
+        # Keep the last MAX_LOG_LINES lines to prevent memory issues
+        excess = self.log_model.rowCount() - MAX_LOG_LINES
+        if excess > 0:
+            self.log_model.removeRows(0, excess)
+        
+        # Auto-scroll to bottom (nothing to scroll while the window is hidden)
+        if at_bottom and self.log_view.isVisible():
+            self.log_view.scrollToBottom()
     
     def show_video_thumbnail(self, video_path):
         """Show a thumbnail of the first frame of the video"""
+        # Selecting the same unchanged file again reuses the thumbnail and the probed properties
         try:
-            # Try using ffmpeg to get a thumbnail if available (to handle corrupt headers)
-            try:
-                # First attempt: try to use ffmpeg directly if available
-                thumbnail_path = os.path.join(os.path.dirname(video_path), f"temp_thumbnail_{int(time.time())}.jpg")
-                result = subprocess.run(
-                    ["ffmpeg", "-y", "-i", video_path, "-ss", "00:00:01", "-vframes", "1", thumbnail_path],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    timeout=5
-                )
-                
-                if os.path.exists(thumbnail_path) and os.path.getsize(thumbnail_path) > 0:
-                    # Load the thumbnail
-                    frame = cv2.imread(thumbnail_path)
-                    if frame is not None:
-                        # Convert to RGB and display
-                        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        h, w, ch = frame.shape
-                        qt_image = QImage(frame.data, w, h, ch * w, QImage.Format.Format_RGB888)
-                        pixmap = QPixmap.fromImage(qt_image)
-                        scaled_pixmap = pixmap.scaled(
-                            self.preview_label.size(),
-                            Qt.AspectRatioMode.KeepAspectRatio,
-                            Qt.TransformationMode.SmoothTransformation
-                        )
-                        self.preview_label.setPixmap(scaled_pixmap)
-                        
-                        # Clean up
-                        try:
-                            os.remove(thumbnail_path)
-                        except:
-                            pass
-                            
-                        # Get video info using ffprobe
-                        try:
-                            result = subprocess.run(
-                                ["ffprobe", "-v", "error", "-select_streams", "v:0", 
-                                 "-show_entries", "stream=width,height,avg_frame_rate,nb_frames", 
-                                 "-of", "csv=p=0", video_path],
-                                stdout=subprocess.PIPE,
-                                stderr=subprocess.PIPE,
-                                text=True,
-                                timeout=5
-                            )
-                            
-                            if result.returncode == 0 and result.stdout:
-                                info = result.stdout.strip().split(',')
-                                if len(info) >= 4:
-                                    width, height, fps_str, frame_count = info
-                                    
-                                    # Parse FPS (can be in form "30000/1001")
-                                    try:
-                                        if '/' in fps_str:
-                                            num, den = map(float, fps_str.split('/'))
-                                            fps = num / den if den else 0
-                                        else:
-                                            fps = float(fps_str)
-                                    except:
-                                        fps = 0
-                                        
-                                    # Log video properties
-                                    duration_sec = int(frame_count) / fps if fps > 0 and frame_count and frame_count != 'N/A' else 0
-                                    duration_str = time.strftime('%H:%M:%S', time.gmtime(duration_sec))
-                                    
-                                    self.append_log(f"Video properties (from ffprobe):")
-                                    self.append_log(f"  Resolution: {width}x{height}")
-                                    self.append_log(f"  FPS: {fps:.2f}")
-                                    
-                                    if frame_count and frame_count != 'N/A':
-                                        self.append_log(f"  Duration: {duration_str} ({frame_count} frames)")
-                                    else:
-                                        self.append_log(f"  Duration: Unknown (frame count not available)")
-                                        
-                                    return  # Success with ffmpeg/ffprobe
-                        except Exception as e:
-                            self.append_log(f"Error getting video info with ffprobe: {str(e)}")
-                
-            except (subprocess.SubprocessError, FileNotFoundError, Exception) as e:
-                self.append_log(f"Could not use ffmpeg for thumbnail: {str(e)}")
-            
-            # Fallback to OpenCV if ffmpeg failed
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                self.append_log("Warning: OpenCV could not open the video file. The file may be corrupted or use an unsupported codec.")
-                self.preview_label.setText("Could not load video preview\nTry a different video format or check if the file is corrupted")
-                return
-                
-            ret, frame = cap.read()
-            if not ret:
-                self.append_log("Warning: Could not read the first frame of the video.")
-                self.preview_label.setText("Could not read video frame\nThe file may be corrupted")
-                cap.release()
-                return
-                
-            # Get video properties
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            
-            # Log video properties
-            duration_sec = frame_count / fps if fps > 0 and frame_count > 0 else 0
-            duration_str = time.strftime('%H:%M:%S', time.gmtime(duration_sec))
-            
-            self.append_log(f"Video properties (from OpenCV):")
-            self.append_log(f"  Resolution: {width}x{height}")
-            self.append_log(f"  FPS: {fps}")
-            
-            if frame_count > 0:
-                self.append_log(f"  Duration: {duration_str} ({frame_count} frames)")
-            else:
-                self.append_log(f"  Duration: Unknown (frame count not available)")
-            
-            # Convert to RGB
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            h, w, ch = frame.shape
-            
-            # Create QImage and QPixmap
-            qt_image = QImage(frame.data, w, h, ch * w, QImage.Format.Format_RGB888)
-            pixmap = QPixmap.fromImage(qt_image)
-            
-            # Scale the pixmap to fit the preview label
-            scaled_pixmap = pixmap.scaled(
-                self.preview_label.size(),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
+            stat = os.stat(video_path)
+            key = (video_path, stat.st_mtime, stat.st_size)
+        except OSError:
+            key = (video_path, None, None)
+        self.thumbnail_key = key
+        cached = self.thumbnail_cache.get(key)
+        if cached is not None:
+            self.thumbnail_cache.move_to_end(key)
+            pixmap, log_lines = cached
+            for line in log_lines:
+                self.append_log(line)
+            self.preview_label.setPixmap(pixmap)
+            return
+        
+        # ffmpeg/ffprobe can take seconds, so load the thumbnail on the thread pool
+        if key not in self.pending_thumbnails:
+            self.pending_thumbnails.add(key)
+            QThreadPool.globalInstance().start(
+                ThumbnailTask(key, self.preview_label.size(), self.has_ffmpeg, self.thumbnail_signals)
             )
-            
-            self.preview_label.setPixmap(scaled_pixmap)
-            cap.release()
-            
-        except Exception as e:
-            self.append_log(f"Error showing video thumbnail: {str(e)}")
-            self.preview_label.setText("Could not load video preview\nThe file may be corrupted or in an unsupported format")
+    
+    @pyqtSlot(object, object, str, list)
+    def thumbnail_loaded(self, key, image, error, log_lines):
+        """Cache a thumbnail loaded by a ThumbnailTask and show it if its video is still the selected one"""
+        self.pending_thumbnails.discard(key)
+        pixmap = QPixmap.fromImage(image) if image is not None else None
+        if pixmap is not None and key[1] is not None:
+            self.thumbnail_cache[key] = (pixmap, log_lines)
+            if len(self.thumbnail_cache) > 256:
+                self.thumbnail_cache.popitem(last=False)
+        if key != self.thumbnail_key:
+            return  # Another video was selected in the meantime
+        
+        for line in log_lines:
+            self.append_log(line)
+        if pixmap is not None:
+            self.preview_label.setPixmap(pixmap)
+        else:
+            self.preview_label.setText(error)
     
     # def check_files_selected(self):
     #     """Check if both input and output files are selected"""
@@ -1227,10 +1472,12 @@ class FaceAnonymizationVideoApp(QMainWindow):
         # Connect signals
         self.processing_thread.progress_updated.connect(self.update_progress)
         self.processing_thread.frame_processed.connect(self.update_frame_preview)
+        self.processing_thread.progress_tick.connect(self.update_progress_tick)
         self.processing_thread.processing_finished.connect(self.processing_finished)
         self.processing_thread.log_message.connect(self.append_log)
         
         # Start processing
+        self.processing_thread.preview_size = self.preview_area_size()
         self.processing_thread.start()
         
         # Update status
@@ -1249,46 +1496,69 @@ class FaceAnonymizationVideoApp(QMainWindow):
             self.status_label.setText("Stopping processing...")
             self.append_log("Stopping processing - please wait...")
     
+    @pyqtSlot(int)
     def update_progress(self, value):
         """Update the progress bar"""
         self.progress_bar.setValue(value)
         self.progress_bar.setFormat(f"{value}%")
     
-    def update_frame_preview(self, image, current_frame=0, total_frames=0):
-        """Update the preview with the current processed frame"""
-        # Update status with simplified progress information
+    @pyqtSlot(int, int)
+    def update_progress_tick(self, current_frame, total_frames):
+        """Update the status with simplified progress information"""
         if total_frames > 0 and current_frame > 0:
             self.status_label.setText(f"Processing: {(current_frame/total_frames*100):.1f}%")
         else:
             self.status_label.setText("Processing...")
-        
+    
+    def preview_area_size(self):
+        """Size (width, height) that live preview frames are fitted to, the preview label minus its margin"""
+        size = self.preview_label.size()
+        return max(1, size.width() - 20), max(1, size.height() - 20)  # 10px margin on each side
+    
+    @pyqtSlot(QImage)
+    def update_frame_preview(self, image):
+        """Update the preview with the current processed frame, at most about 30 times per second"""
         # Only update the image if we received a valid one
-        if not image.isNull():
+        if image.isNull():
+            return
+        # Keep only the latest frame; it is shown once the interval since the last shown frame has passed
+        already_scheduled = self.pending_preview is not None
+        self.pending_preview = image
+        if not already_scheduled:
+            delay = self.last_preview_time + PREVIEW_INTERVAL - time.monotonic()
+            QTimer.singleShot(max(0, int(delay * 1000)), self.show_pending_preview)
+    
+    def show_pending_preview(self):
+        """Show the latest frame passed to update_frame_preview"""
+        image, self.pending_preview = self.pending_preview, None
+        # Same cacheKey means the same, unmodified image that is already on screen
+        if image is not None and image.cacheKey() != self.last_preview_key:
+            self.last_preview_time = time.monotonic()
+            self.last_preview_key = image.cacheKey()
             pixmap = QPixmap.fromImage(image)
             
-            # Get the current size of the preview area with some margin
-            preview_size = self.preview_label.size()
-            available_width = preview_size.width() - 20  # 10px margin on each side
-            available_height = preview_size.height() - 20
-            
-            # Calculate the scaling needed to fit the image
-            img_width = pixmap.width()
-            img_height = pixmap.height()
-            
-            # Calculate scale factors to fit width and height
-            w_scale = available_width / img_width
-            h_scale = available_height / img_height
-            
-            # Use the smaller scale to ensure the entire image fits
-            scale_factor = min(w_scale, h_scale)
+            # The fitted size only changes when the label or the frame size changes
+            key = (self.preview_label.size(), pixmap.size())
+            if key != self.preview_fit_key:
+                self.preview_fit_key = key
+                preview_size, img_size = key
+                # Size of the preview area with some margin
+                available_width = preview_size.width() - 20  # 10px margin on each side
+                available_height = preview_size.height() - 20
+                
+                # Use the smaller scale to ensure the entire image fits
+                scale_factor = min(available_width / img_size.width(), available_height / img_size.height())
+                self.preview_fit_size = QSize(round(img_size.width() * scale_factor), round(img_size.height() * scale_factor))
             
-            # Scale the pixmap while maintaining aspect ratio
-            scaled_pixmap = pixmap.scaled(
-                int(img_width * scale_factor),
-                int(img_height * scale_factor),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
+            # The worker already scales frames to the preview area, so this is usually a no-op.
+            # Live frames are small and replaced several times per second, fast scaling is good enough
+            scaled_pixmap = pixmap
+            if pixmap.size() != self.preview_fit_size:
+                scaled_pixmap = pixmap.scaled(
+                    self.preview_fit_size,
+                    Qt.AspectRatioMode.KeepAspectRatio,
+                    Qt.TransformationMode.FastTransformation
+                )
             
             self.preview_label.setPixmap(scaled_pixmap)
             self.preview_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -1317,6 +1587,8 @@ class FaceAnonymizationVideoApp(QMainWindow):
                         self.processing_thread.progress_updated.disconnect()
                     if hasattr(self.processing_thread, 'frame_processed'):
                         self.processing_thread.frame_processed.disconnect()
+                    if hasattr(self.processing_thread, 'progress_tick'):
+                        self.processing_thread.progress_tick.disconnect()
                     if hasattr(self.processing_thread, 'processing_finished'):
                         self.processing_thread.processing_finished.disconnect()
                     if hasattr(self.processing_thread, 'log_message'):
@@ -1,5 +1,6 @@
 import sys
 import os
+import shutil
 import subprocess
 import time
 import datetime
@@ -7,6 +8,7 @@ import re
 import cv2
 import numpy as np
 from pathlib import Path
+from functools import lru_cache
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QLabel, QPushButton, 
                             QVBoxLayout, QHBoxLayout, QFileDialog, QSlider, QWidget,
                             QProgressBar, QComboBox, QSpinBox, QCheckBox, QGroupBox,
@@ -15,9 +17,24 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QLabel, QPushButton,
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer
 from PyQt6.QtGui import QImage, QPixmap, QColor
 
+from video_capture import open_video_capture
+
+try:
+    from decord import VideoReader, cpu
+except ImportError:  # Decord is optional, it is only used for faster preview seeking
+    VideoReader = None
+
+
+@lru_cache(maxsize=None)
+def has_ffprobe():
+    """Check once per process whether ffprobe is on the PATH"""
+    return shutil.which("ffprobe") is not None
+
 
 def detect_video_orientation(video_path):
     """Detect if a video needs rotation based on metadata"""
+    if not has_ffprobe():
+        return None  # Don't try to spawn a missing tool for every video
     try:
         # Use ffprobe to get video rotation metadata
         result = subprocess.run(
@@ -44,6 +61,36 @@ def detect_video_orientation(video_path):
     return None
 
 
+def read_middle_frame(video_path):
+    """Decode the middle frame of a video for the preview.
+
+    Returns (frame, qimage_format, fps, frame_count), or None if the video can't be read.
+    """
+    if VideoReader is not None:
+        try:
+            # Decord seeks via its keyframe index instead of decoding forward from the start of the GOP
+            vr = VideoReader(video_path, ctx=cpu(0))
+            frame_count = len(vr)
+            frame = vr[frame_count // 2].asnumpy()  # Decord decodes to RGB
+            return frame, QImage.Format.Format_RGB888, vr.get_avg_fps(), frame_count
+        except Exception:
+            pass  # Fall back to OpenCV for anything Decord can't handle
+
+    cap = open_video_capture(video_path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count // 2)
+        ret, frame = cap.read()
+        if not ret:
+            return None
+        return frame, QImage.Format.Format_BGR888, fps, frame_count
+    finally:
+        cap.release()
+
+
 class VideoProcessingThread(QThread):
     """Thread for extracting frames from videos without freezing the UI"""
     progress_updated = pyqtSignal(int)
@@ -58,6 +105,7 @@ class VideoProcessingThread(QThread):
         self.output_dir = output_dir
         self.options = options
         self.is_running = True
+        self.progress_range = (0, 100)  # Share of the progress bar covered by the current video
     
     def run(self):
         try:
@@ -93,6 +141,9 @@ class VideoProcessingThread(QThread):
                     self.log_message.emit(f"Folder already exists for {video_filename}. Skipping...")
                     continue
                 
+                # Report progress within this video's share of the overall progress
+                self.progress_range = (i * 100 / total_files, (i + 1) * 100 / total_files)
+                
                 # Auto-detect rotation if not manually specified
                 if self.options.get("rotation") is None:
                     auto_rotation = detect_video_orientation(video_path)
@@ -187,7 +238,7 @@ class VideoProcessingThread(QThread):
     def video2img(self, video_path, dest_dir, time_intvl=1, rotate_code=None):
         """Extract frames from video at specific time intervals"""
         num_img = 0
-        video_cap = cv2.VideoCapture(video_path)
+        video_cap = open_video_capture(video_path)
         
         if not video_cap.isOpened():
             self.log_message.emit(f"Error: Could not open video {video_path}")
@@ -200,19 +251,32 @@ class VideoProcessingThread(QThread):
         frame_intvl = fps * time_intvl
         self.log_message.emit(f"Frame interval: {frame_intvl:.2f} frames")
         
+        frame_total = int(video_cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        progress_start, progress_end = self.progress_range
+        last_progress = -1
         count = 0
-        success = True
         
-        while success and self.is_running:
-            success, frame = video_cap.read()
-            
-            if not success:
+        while self.is_running:
+            # grab() only advances the stream; converting to a BGR image in retrieve()
+            # is only paid for the frames that are actually extracted
+            if not video_cap.grab():
                 break
                 
             count += 1
             time_stamp = count / fps
             
+            # Update progress bar only when the percentage changes
+            if frame_total > 0:
+                progress = int(progress_start + (progress_end - progress_start) * min(count / frame_total, 1.0))
+                if progress != last_progress:
+                    last_progress = progress
+                    self.progress_updated.emit(progress)
+            
             if count % int(frame_intvl) == 0:
+                success, frame = video_cap.retrieve()
+                if not success:
+                    break
+                
                 # Apply rotation if specified
                 if rotate_code is not None:
                     frame = cv2.rotate(frame, rotate_code)
@@ -229,10 +293,9 @@ class VideoProcessingThread(QThread):
                 
                 # Emit signal with extracted frame for preview
                 if num_img % 10 == 0:  # Only emit every 10th frame to avoid UI overload
-                    # Convert to RGB for Qt
-                    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    h, w, ch = rgb_frame.shape
-                    qt_image = QImage(rgb_frame.data, w, h, ch * w, QImage.Format.Format_RGB888)
+                    # Qt reads OpenCV's BGR layout directly; copy because frame is reused after the emit
+                    h, w = frame.shape[:2]
+                    qt_image = QImage(frame.data, w, h, frame.strides[0], QImage.Format.Format_BGR888).copy()
                     self.frame_extracted.emit(output_filename, qt_image)
                 
                 num_img += 1
@@ -496,29 +559,16 @@ class FrameExtractionApp(QMainWindow):
         self.current_preview_file = file_path
         
         try:
-            # Open video
-            cap = cv2.VideoCapture(file_path)
-            if not cap.isOpened():
-                self.preview_label.setText("Could not open video file")
-                return
-            
-            # Get video properties
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            duration = frame_count / fps if fps > 0 else 0
-            
             # Get middle frame for preview
-            middle_frame = frame_count // 2
-            cap.set(cv2.CAP_PROP_POS_FRAMES, middle_frame)
-            ret, frame = cap.read()
+            result = read_middle_frame(file_path)
             
-            if ret:
-                # Convert to RGB for Qt
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w, ch = frame.shape
+            if result is not None:
+                frame, image_format, fps, frame_count = result
+                duration = frame_count / fps if fps > 0 else 0
+                h, w = frame.shape[:2]
                 
-                # Create QImage and QPixmap
-                qt_image = QImage(frame.data, w, h, ch * w, QImage.Format.Format_RGB888)
+                # Create QImage (directly from the decoder's channel order) and QPixmap
+                qt_image = QImage(frame.data, w, h, frame.strides[0], image_format)
                 pixmap = QPixmap.fromImage(qt_image)
                 
                 # Scale the pixmap to fit the preview label
@@ -539,8 +589,6 @@ class FrameExtractionApp(QMainWindow):
             else:
                 self.preview_label.setText("Could not read video frame")
             
-            cap.release()
-            
         except Exception as e:
             self.preview_label.setText(f"Error loading video preview: {str(e)}")
     
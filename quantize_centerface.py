@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import tempfile
+
+import imageio
+import onnx
+from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat,
+                                      QuantType, quantize_static)
+
+from centerface import CenterFace, default_onnx_path, default_int8_onnx_path, ensure_rgb, preprocess_batch
+from deface import get_file_type
+
+
+def iter_calibration_frames(paths, frame_step):
+    """Yield RGB frames from images and (every frame_step-th frame of) videos"""
+    for path in paths:
+        filetype = get_file_type(path)
+        if filetype == 'image':
+            # Grayscale and RGBA images are converted like CenterFace converts its input
+            yield ensure_rgb(imageio.imread(path))
+        elif filetype == 'video':
+            reader = imageio.get_reader(path)
+            try:
+                for i, frame in enumerate(reader.iter_data()):
+                    if i % frame_step == 0:
+                        yield frame
+            finally:
+                reader.close()
+        else:
+            print(f'Skipping {path} ({filetype})')
+
+
+class FrameCalibrationReader(CalibrationDataReader):
+    """Feeds preprocessed frames to the ONNX Runtime calibrator"""
+    def __init__(self, frames, size, num_frames):
+        self.frames = frames
+        self.size = size
+        self.remaining = num_frames
+
+    def get_next(self):
+        if self.remaining <= 0:
+            return None
+        frame = next(self.frames, None)
+        if frame is None:
+            return None
+        self.remaining -= 1
+        # Same resizing and conversion as at inference, so the calibrated ranges match what the model sees
+        return {'input.1': preprocess_batch([frame], self.size)}
+
+
+def parse_cli_args():
+    parser = argparse.ArgumentParser(description='Create an INT8 version of the CenterFace model by static quantization')
+    parser.add_argument(
+        'input', nargs='+',
+        help='Images, videos or directories with representative footage for calibration.')
+    parser.add_argument(
+        '--output', '-o', default=default_int8_onnx_path, metavar='O',
+        help=f'Output model path. Default: {default_int8_onnx_path} (used by the onnxrt backend with --int8).')
+    parser.add_argument(
+        '--scale', '-s', default='640x360', metavar='WxH',
+        help='Network input size used for calibration. Default: 640x360.')
+    parser.add_argument(
+        '--num-frames', default=500, type=int, metavar='N',
+        help='Maximum number of calibration frames. Default: 500.')
+    parser.add_argument(
+        '--frame-step', default=15, type=int, metavar='K',
+        help='Use every K-th frame of calibration videos. Default: 15.')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_cli_args()
+    paths = []
+    for path in args.input:
+        if os.path.isdir(path):
+            paths.extend(os.path.join(path, file) for file in sorted(os.listdir(path)))
+        else:
+            paths.append(path)
+
+    w, h = (int(v) for v in args.scale.split('x'))
+    w_new, h_new, _, _ = CenterFace.shape_transform((w, h), (h, w))
+
+    # Quantize the model with dynamic batch and spatial dims, like CenterFace runs it
+    dyn_model = CenterFace.dynamicize_shapes(onnx.load(default_onnx_path))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dyn_path = os.path.join(tmpdir, 'centerface_dyn.onnx')
+        onnx.save(dyn_model, dyn_path)
+        frames = iter_calibration_frames(paths, args.frame_step)
+        reader = FrameCalibrationReader(frames, (w_new, h_new), args.num_frames)
+        try:
+            # Symmetric INT8 Q/DQ nodes run on the ORT CPU provider and can be consumed by TensorRT
+            quantize_static(
+                dyn_path, args.output, reader,
+                quant_format=QuantFormat.QDQ,
+                activation_type=QuantType.QInt8,
+                weight_type=QuantType.QInt8,
+                calibrate_method=CalibrationMethod.Entropy,
+                extra_options={'ActivationSymmetric': True, 'WeightSymmetric': True},
+            )
+        finally:
+            frames.close()  # Closes a video reader that --num-frames stopped early
+    print(f'Quantized model saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+import cv2
+
+
+def open_video_capture(path):
+    """Open a video with OpenCV's FFmpeg backend, decoding on the GPU if the OpenCV build supports it"""
+    cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+    if not cap.isOpened():
+        # OpenCV builds without FFmpeg, let OpenCV pick whatever backend it has
+        cap = cv2.VideoCapture(path)
+    return cap